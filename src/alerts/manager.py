@@ -3,10 +3,14 @@ Alert management system for DPLUS Dashboard.
 Monitors metrics and triggers alerts based on configurable thresholds.
 """
 
-from typing import Dict, List, Optional, Callable
+from typing import Deque, Dict, List, Optional, Callable
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dataclasses import dataclass, field
 from enum import Enum
+import itertools
+import time
 import sys
 import os
 
@@ -22,9 +26,22 @@ class AlertSeverity(Enum):
     CRITICAL = 'critical'
 
 
-@dataclass
+_SEVERITY_COLORS = {
+    AlertSeverity.CRITICAL: '#DC2626',
+    AlertSeverity.WARNING: '#F59E0B',
+    AlertSeverity.INFO: '#3B82F6'
+}
+
+
+@dataclass(slots=True)
 class Alert:
-    """Represents a single alert."""
+    """
+    Represents a single alert.
+
+    timestamp is epoch seconds (a float from time.time()), not a datetime;
+    to_dict still serializes it as an ISO 8601 string. Use acknowledge()
+    rather than setting acknowledged directly so the cached dict is refreshed.
+    """
     id: str
     metric: str
     severity: AlertSeverity
@@ -32,23 +49,32 @@ class Alert:
     current_value: float
     threshold: float
     change_pct: float
-    timestamp: datetime = field(default_factory=datetime.now)
+    timestamp: float = field(default_factory=time.time)  # epoch seconds
     acknowledged: bool = False
     details: Dict = field(default_factory=dict)
+    _cached_dict: Optional[Dict] = field(default=None, init=False, repr=False, compare=False)
+
+    def acknowledge(self):
+        """Mark the alert acknowledged and drop the cached dict."""
+        self.acknowledged = True
+        self._cached_dict = None
 
     def to_dict(self) -> Dict:
-        return {
-            'id': self.id,
-            'metric': self.metric,
-            'severity': self.severity.value,
-            'message': self.message,
-            'current_value': self.current_value,
-            'threshold': self.threshold,
-            'change_pct': self.change_pct,
-            'timestamp': self.timestamp.isoformat(),
-            'acknowledged': self.acknowledged,
-            'details': self.details
-        }
+        """Serialized alert; built once and shared, so callers must not mutate it."""
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'id': self.id,
+                'metric': self.metric,
+                'severity': self.severity.value,
+                'message': self.message,
+                'current_value': self.current_value,
+                'threshold': self.threshold,
+                'change_pct': self.change_pct,
+                'timestamp': datetime.fromtimestamp(self.timestamp).isoformat(),
+                'acknowledged': self.acknowledged,
+                'details': self.details
+            }
+        return self._cached_dict
 
 
 class AlertManager:
@@ -67,19 +93,32 @@ class AlertManager:
         'volatility_high': 0.40,          # CV > 40% = high volatility
     }
 
-    def __init__(self, custom_thresholds: Optional[Dict] = None):
+    def __init__(self, custom_thresholds: Optional[Dict] = None, max_history: int = 10000):
         self.thresholds = self.DEFAULT_THRESHOLDS.copy()
         if custom_thresholds:
             self.thresholds.update(custom_thresholds)
 
         self.active_alerts: List[Alert] = []
-        self.alert_history: List[Alert] = []
+        self._active_by_id: Dict[str, Alert] = {}
+        self._severity_counts: Dict[AlertSeverity, int] = {severity: 0 for severity in AlertSeverity}
+        self._unacknowledged = 0
+        self.alert_history: Deque[Alert] = deque(maxlen=max_history)
         self.callbacks: List[Callable] = []
-        self._alert_counter = 0
+        self._callback_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='alert-cb')
+        self._id_counter = itertools.count(1)
+        self._id_prefix = ''
+        self._id_prefix_expires = 0.0
 
     def _generate_alert_id(self) -> str:
-        self._alert_counter += 1
-        return f"alert_{datetime.now().strftime('%Y%m%d')}_{self._alert_counter:04d}"
+        now = time.time()
+        if now >= self._id_prefix_expires:
+            # Format the date prefix once per day; expire it at local midnight
+            local = time.localtime(now)
+            self._id_prefix = f"alert_{time.strftime('%Y%m%d', local)}"
+            self._id_prefix_expires = time.mktime(
+                (local.tm_year, local.tm_mon, local.tm_mday + 1, 0, 0, 0, 0, 0, -1)
+            )
+        return f"{self._id_prefix}_{next(self._id_counter):04d}"
 
     def check_alerts(self, current: Dict, previous: Dict) -> List[Alert]:
         """
@@ -134,15 +173,15 @@ class AlertManager:
 
                 new_alerts.append(alert)
                 self.active_alerts.append(alert)
+                self._active_by_id[alert.id] = alert
+                self._severity_counts[alert.severity] += 1
+                self._unacknowledged += 1
                 self.alert_history.append(alert)
 
-            # Trigger callbacks for new alerts
+            # Dispatch callbacks in the background so slow notifiers don't block detection
             for alert in new_alerts:
                 for callback in self.callbacks:
-                    try:
-                        callback(alert)
-                    except Exception as e:
-                        log_error(e, {'operation': 'alert_callback', 'alert_id': alert.id})
+                    self._callback_pool.submit(self._invoke_callback, callback, alert)
 
             if new_alerts:
                 log_info(f"Generated {len(new_alerts)} new alerts", {
@@ -155,6 +194,17 @@ class AlertManager:
             log_error(e, {'operation': 'check_alerts'})
             return []
 
+    def _invoke_callback(self, callback: Callable, alert: Alert):
+        """Run a single alert callback, logging any failure."""
+        try:
+            callback(alert)
+        except Exception as e:
+            log_error(e, {'operation': 'alert_callback', 'alert_id': alert.id})
+
+    def shutdown(self, wait: bool = True):
+        """Stop the callback worker pool."""
+        self._callback_pool.shutdown(wait=wait)
+
     def _get_metric_key(self, metric_name: str) -> str:
         """Convert metric name to config key."""
         mapping = {
@@ -166,26 +216,34 @@ class AlertManager:
 
     def acknowledge_alert(self, alert_id: str) -> bool:
         """Mark an alert as acknowledged."""
-        for alert in self.active_alerts:
-            if alert.id == alert_id:
-                alert.acknowledged = True
-                log_info(f"Alert acknowledged: {alert_id}")
-                return True
-        return False
+        alert = self._active_by_id.get(alert_id)
+        if alert is None:
+            return False
+        if not alert.acknowledged:
+            alert.acknowledge()
+            self._unacknowledged -= 1
+        log_info(f"Alert acknowledged: {alert_id}")
+        return True
 
     def clear_alert(self, alert_id: str) -> bool:
         """Remove an alert from active alerts."""
-        for i, alert in enumerate(self.active_alerts):
-            if alert.id == alert_id:
-                self.active_alerts.pop(i)
-                log_info(f"Alert cleared: {alert_id}")
-                return True
-        return False
+        alert = self._active_by_id.pop(alert_id, None)
+        if alert is None:
+            return False
+        self.active_alerts.remove(alert)
+        self._severity_counts[alert.severity] -= 1
+        if not alert.acknowledged:
+            self._unacknowledged -= 1
+        log_info(f"Alert cleared: {alert_id}")
+        return True
 
     def clear_all_alerts(self):
         """Clear all active alerts."""
         count = len(self.active_alerts)
         self.active_alerts.clear()
+        self._active_by_id.clear()
+        self._severity_counts = {severity: 0 for severity in AlertSeverity}
+        self._unacknowledged = 0
         log_info(f"Cleared {count} active alerts")
 
     def get_active_alerts(self, severity: Optional[AlertSeverity] = None) -> List[Alert]:
@@ -199,11 +257,11 @@ class AlertManager:
         return {
             'total_active': len(self.active_alerts),
             'by_severity': {
-                'critical': len([a for a in self.active_alerts if a.severity == AlertSeverity.CRITICAL]),
-                'warning': len([a for a in self.active_alerts if a.severity == AlertSeverity.WARNING]),
-                'info': len([a for a in self.active_alerts if a.severity == AlertSeverity.INFO])
+                'critical': self._severity_counts[AlertSeverity.CRITICAL],
+                'warning': self._severity_counts[AlertSeverity.WARNING],
+                'info': self._severity_counts[AlertSeverity.INFO]
             },
-            'unacknowledged': len([a for a in self.active_alerts if not a.acknowledged]),
+            'unacknowledged': self._unacknowledged,
             'total_history': len(self.alert_history)
         }
 
@@ -232,7 +290,7 @@ class AlertManager:
             <div style="padding: 10px; border-left: 4px solid {self._get_severity_color(alert.severity)};">
                 <strong>[{alert.severity.value.upper()}]</strong> {alert.metric}<br>
                 {alert.message}<br>
-                <small>At {alert.timestamp.strftime('%Y-%m-%d %H:%M')}</small>
+                <small>At {time.strftime('%Y-%m-%d %H:%M', time.localtime(alert.timestamp))}</small>
             </div>
             """
         elif format_type == 'slack':
@@ -242,12 +300,7 @@ class AlertManager:
 
     def _get_severity_color(self, severity: AlertSeverity) -> str:
         """Get color for severity level."""
-        colors = {
-            AlertSeverity.CRITICAL: '#DC2626',
-            AlertSeverity.WARNING: '#F59E0B',
-            AlertSeverity.INFO: '#3B82F6'
-        }
-        return colors.get(severity, '#6B7280')
+        return _SEVERITY_COLORS.get(severity, '#6B7280')
 
 
 # Global alert manager instance
@@ -5,7 +5,8 @@ Identifies unusual patterns in revenue and performance metrics.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
 import sys
 import os
 
@@ -13,6 +14,16 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.logger import log_error
 
+# Sort order for alert severities (most severe first)
+_SEVERITY_ORDER = {'critical': 0, 'warning': 1, 'info': 2}
+
+# (metric key, display name, threshold prefix) checked by detect_performance_changes
+_PERFORMANCE_METRICS = (
+    ('total_revenue', 'revenue', 'revenue'),
+    ('aov', 'AOV', 'aov'),
+    ('total_orders', 'orders', 'orders'),
+)
+
 
 def detect_revenue_anomalies(
     data: pd.DataFrame,
@@ -42,12 +53,14 @@ def detect_revenue_anomalies(
             return df
 
         values = df[value_col]
+        flat = False  # no spread in the data -> every score is 0
 
         if method == 'zscore':
             mean = values.mean()
             std = values.std()
 
             if std == 0:
+                flat = True
                 df['anomaly_score'] = 0
                 df['is_anomaly'] = False
             else:
@@ -62,17 +75,23 @@ def detect_revenue_anomalies(
             lower_bound = q1 - threshold * iqr
             upper_bound = q3 + threshold * iqr
 
-            df['anomaly_score'] = values.apply(
-                lambda x: (x - values.median()) / iqr if iqr > 0 else 0
-            )
+            if iqr > 0:
+                df['anomaly_score'] = (values - values.median()) / iqr
+            else:
+                flat = True
+                df['anomaly_score'] = 0
             df['is_anomaly'] = (values < lower_bound) | (values > upper_bound)
 
         # Classify anomaly type
-        df['anomaly_type'] = df.apply(
-            lambda row: 'spike' if row['anomaly_score'] > threshold else
-            'drop' if row['anomaly_score'] < -threshold else 'normal',
-            axis=1
-        )
+        if flat and threshold >= 0:
+            df['anomaly_type'] = 'normal'
+        else:
+            score = df['anomaly_score'].to_numpy()
+            df['anomaly_type'] = np.select(
+                [score > threshold, score < -threshold],
+                ['spike', 'drop'],
+                default='normal'
+            )
 
         return df
 
@@ -107,57 +126,84 @@ def detect_performance_changes(
             'orders_spike': 0.50
         }
 
-    alerts = []
-
     try:
-        metrics_to_check = [
-            ('total_revenue', 'revenue', thresholds['revenue_drop'], thresholds['revenue_spike']),
-            ('aov', 'AOV', thresholds['aov_drop'], thresholds['aov_spike']),
-            ('total_orders', 'orders', thresholds['orders_drop'], thresholds['orders_spike'])
-        ]
-
-        for metric_key, metric_name, drop_thresh, spike_thresh in metrics_to_check:
-            curr_val = current.get(metric_key, 0)
-            prev_val = previous.get(metric_key, 0)
-
-            if prev_val == 0:
-                continue
-
-            change_pct = (curr_val - prev_val) / prev_val
-
-            if change_pct <= -drop_thresh:
-                severity = 'critical' if change_pct <= -0.4 else 'warning'
-                alerts.append({
-                    'metric': metric_name,
-                    'type': 'drop',
-                    'severity': severity,
-                    'change_pct': change_pct * 100,
-                    'current': curr_val,
-                    'previous': prev_val,
-                    'message': f"{metric_name} dropped {abs(change_pct)*100:.1f}% ({prev_val:,.0f} to {curr_val:,.0f})"
-                })
-            elif change_pct >= spike_thresh:
-                alerts.append({
-                    'metric': metric_name,
-                    'type': 'spike',
-                    'severity': 'info',
-                    'change_pct': change_pct * 100,
-                    'current': curr_val,
-                    'previous': prev_val,
-                    'message': f"{metric_name} increased {change_pct*100:.1f}% ({prev_val:,.0f} to {curr_val:,.0f})"
-                })
-
-        # Sort by severity
-        severity_order = {'critical': 0, 'warning': 1, 'info': 2}
-        alerts.sort(key=lambda x: severity_order.get(x['severity'], 3))
-
-        return alerts
+        curr_vals = tuple(current.get(key, 0) for key, _, _ in _PERFORMANCE_METRICS)
+        prev_vals = tuple(previous.get(key, 0) for key, _, _ in _PERFORMANCE_METRICS)
+        thresh_vals = tuple(
+            (thresholds[f'{prefix}_drop'], thresholds[f'{prefix}_spike'])
+            for _, _, prefix in _PERFORMANCE_METRICS
+        )
+
+        alerts = _detect_performance_changes_cached(curr_vals, prev_vals, thresh_vals)
+        return [dict(alert) for alert in alerts]
 
     except Exception as e:
         log_error(e, {'operation': 'detect_performance_changes'})
         return []
 
 
+@lru_cache(maxsize=128)
+def _detect_performance_changes_cached(
+    curr_vals: Tuple,
+    prev_vals: Tuple,
+    thresh_vals: Tuple
+) -> Tuple[Dict, ...]:
+    """Memoized core of detect_performance_changes, keyed on the metric values."""
+    curr = np.asarray(curr_vals, dtype=np.float64)
+    prev = np.asarray(prev_vals, dtype=np.float64)
+    thresh = np.asarray(thresh_vals, dtype=np.float64)
+
+    # Evaluate all metrics at once; metrics without a previous value never fire
+    valid = prev != 0
+    change = np.divide(curr - prev, prev, out=np.zeros_like(curr), where=valid)
+    drop_mask = valid & (change <= -thresh[:, 0])
+    spike_mask = valid & ~drop_mask & (change >= thresh[:, 1])
+
+    alerts = []
+
+    for i in np.flatnonzero(drop_mask | spike_mask):
+        metric_name = _PERFORMANCE_METRICS[i][1]
+        curr_val = curr_vals[i]
+        prev_val = prev_vals[i]
+        change_pct = float(change[i])
+
+        if drop_mask[i]:
+            severity = 'critical' if change_pct <= -0.4 else 'warning'
+            alerts.append({
+                'metric': metric_name,
+                'type': 'drop',
+                'severity': severity,
+                'change_pct': change_pct * 100,
+                'current': curr_val,
+                'previous': prev_val,
+                'message': f"{metric_name} dropped {abs(change_pct)*100:.1f}% ({prev_val:,.0f} to {curr_val:,.0f})"
+            })
+        else:
+            alerts.append({
+                'metric': metric_name,
+                'type': 'spike',
+                'severity': 'info',
+                'change_pct': change_pct * 100,
+                'current': curr_val,
+                'previous': prev_val,
+                'message': f"{metric_name} increased {change_pct*100:.1f}% ({prev_val:,.0f} to {curr_val:,.0f})"
+            })
+
+    # Sort by severity
+    alerts.sort(key=lambda x: _SEVERITY_ORDER.get(x['severity'], 3))
+
+    return tuple(alerts)
+
+
+def _longest_run(mask: np.ndarray) -> int:
+    """Length of the longest run of True values in a boolean array."""
+    if not mask.any():
+        return 0
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[::2]).max())
+
+
 def detect_consecutive_patterns(
     data: pd.DataFrame,
     value_col: str = 'revenue',
@@ -181,27 +227,12 @@ def detect_consecutive_patterns(
         df = data.copy().sort_values('date' if 'date' in data.columns else 'period')
         values = df[value_col].values
 
-        # Calculate day-over-day changes
-        changes = np.diff(values)
-
-        # Find consecutive declining/growing streaks
-        declining_streak = 0
-        growing_streak = 0
-        current_decline = 0
-        current_growth = 0
-
-        for change in changes:
-            if change < 0:
-                current_decline += 1
-                current_growth = 0
-                declining_streak = max(declining_streak, current_decline)
-            elif change > 0:
-                current_growth += 1
-                current_decline = 0
-                growing_streak = max(growing_streak, current_growth)
-            else:
-                current_decline = 0
-                current_growth = 0
+        # Calculate day-over-day change direction
+        signs = np.sign(np.diff(values.astype(np.float64)))
+
+        # Find longest consecutive declining/growing streaks
+        declining_streak = _longest_run(signs == -1)
+        growing_streak = _longest_run(signs == 1)
 
         return {
             'declining_streak': declining_streak,
@@ -236,16 +267,25 @@ def calculate_volatility(
         return {'coefficient_of_variation': 0, 'volatility_level': 'unknown'}
 
     try:
-        values = data[value_col]
-
-        mean_val = values.mean()
-        std_val = values.std()
+        arr = data[value_col].to_numpy(dtype=np.float64)
+        n = arr.size
+
+        # Moments skip NaN like the pandas reductions; two-pass std stays stable
+        # when revenue is large and the spread is small
+        valid = arr[~np.isnan(arr)]
+        if valid.size:
+            mean_val = valid.mean()
+            min_val = valid.min()
+            max_val = valid.max()
+        else:
+            mean_val = min_val = max_val = np.nan
+        std_val = valid.std(ddof=1) if valid.size > 1 else np.nan
 
         # Coefficient of variation
         cv = (std_val / mean_val * 100) if mean_val > 0 else 0
 
-        # Rolling volatility
-        rolling_std = values.rolling(window=window).std().iloc[-1] if len(values) >= window else std_val
+        # Rolling volatility (only the trailing window is needed)
+        rolling_std = arr[-window:].std(ddof=1) if n >= window else std_val
 
         # Classify volatility
         if cv < 20:
@@ -263,8 +303,8 @@ def calculate_volatility(
             'mean': mean_val,
             'rolling_std': rolling_std,
             'volatility_level': level,
-            'range': values.max() - values.min(),
-            'range_pct': ((values.max() - values.min()) / mean_val * 100) if mean_val > 0 else 0
+            'range': max_val - min_val,
+            'range_pct': ((max_val - min_val) / mean_val * 100) if mean_val > 0 else 0
         }
 
     except Exception as e:
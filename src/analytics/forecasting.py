@@ -5,8 +5,6 @@ Trend forecasting and statistical analysis for DPLUS Dashboard.
 import pandas as pd
 import numpy as np
 from typing import Dict
-from datetime import timedelta
-from scipy import stats
 import sys
 import os
 
@@ -41,6 +39,8 @@ def forecast_revenue(
         }
 
     try:
+        from scipy import stats  # deferred: only needed for regression statistics
+
         df = historical_data.copy()
         df = df.sort_values('date')
 
@@ -61,8 +61,30 @@ def forecast_revenue(
         x = daily_revenue['days'].values
         y = daily_revenue['revenue'].values
 
-        # Linear regression
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+        # Linear regression (least squares; sums are reused for the intervals)
+        n = len(x)
+        mean_x = x.mean()
+        mean_y = y.mean()
+        dx = x - mean_x
+        dy = y - mean_y
+        ss_x = np.dot(dx, dx)
+        if ss_x == 0:
+            raise ValueError('Cannot forecast when all dates are identical')
+        ss_xy = np.dot(dx, dy)
+        ss_tot = np.dot(dy, dy)
+
+        slope = ss_xy / ss_x
+        intercept = mean_y - slope * mean_x
+        resid = y - (intercept + slope * x)
+        ss_res = np.dot(resid, resid)
+        r_squared = ss_xy ** 2 / (ss_x * ss_tot) if ss_tot > 0 else 0.0
+
+        # Two-sided p-value for the slope
+        if r_squared < 1:
+            t_stat = np.sqrt(r_squared * (n - 2) / (1 - r_squared))
+            p_value = 2 * stats.t.sf(t_stat, n - 2)
+        else:
+            p_value = 0.0
 
         # Calculate forecast
         last_day = x.max()
@@ -70,10 +92,7 @@ def forecast_revenue(
         forecast_values = intercept + slope * forecast_days
 
         # Confidence intervals
-        n = len(x)
-        mean_x = np.mean(x)
-        ss_x = np.sum((x - mean_x) ** 2)
-        se_y = np.sqrt(np.sum((y - (intercept + slope * x)) ** 2) / (n - 2))
+        se_y = np.sqrt(ss_res / (n - 2))
 
         # t-value for confidence level
         t_val = stats.t.ppf((1 + confidence_level) / 2, n - 2)
@@ -88,7 +107,7 @@ def forecast_revenue(
         ci_lower = np.maximum(ci_lower, 0)
 
         # Generate forecast dates
-        forecast_dates = [first_date + timedelta(days=int(d)) for d in forecast_days]
+        forecast_dates = first_date + pd.to_timedelta(forecast_days, unit='D')
 
         # Determine trend direction
         if slope > 0 and p_value < 0.05:
@@ -108,7 +127,7 @@ def forecast_revenue(
             'trend': trend,
             'slope': slope,
             'intercept': intercept,
-            'r_squared': r_value ** 2,
+            'r_squared': r_squared,
             'p_value': p_value,
             'confidence_level': confidence_level,
             'daily_change': slope,
@@ -141,6 +160,8 @@ def calculate_trend_significance(data: pd.Series) -> Dict:
         }
 
     try:
+        from scipy import stats  # deferred: only needed for regression statistics
+
         x = np.arange(len(data))
         y = data.values
 
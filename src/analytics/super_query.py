@@ -7,6 +7,35 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 from datetime import date
+from itertools import chain
+
+
+# Segment labels in display order; stored as categorical codes 0/1/2
+REVENUE_SEGMENTS = ['Max', 'Middle', 'Min']
+PRODUCT_SEGMENTS = ['Hero', 'Core', 'Volume']
+
+
+def _segment_codes(top_mask: np.ndarray, bottom_mask: np.ndarray) -> np.ndarray:
+    """int8 segment codes: 0 where top_mask, else 2 where bottom_mask, else 1."""
+    codes = np.ones(top_mask.shape, dtype=np.int8)
+    codes[bottom_mask] = 2
+    codes[top_mask] = 0
+    return codes
+
+
+def _top_k_indices(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """
+    Positions of the k largest (or smallest) values, best first, via partial selection.
+
+    Ties are broken on position like nlargest/nsmallest(keep='first'): every
+    value tying the k-th is a candidate, and the earliest rows win.
+    """
+    keys = -values if largest else values
+    if len(keys) > k:
+        kth = np.partition(keys, k - 1)[k - 1]
+        idx = np.flatnonzero(keys <= kth)
+        return idx[np.lexsort((idx, keys[idx]))[:k]]
+    return np.argsort(keys, kind='stable')
 
 
 # =============================================================================
@@ -40,13 +69,13 @@ def analyze_revenue_trend(df: pd.DataFrame) -> Dict:
         }
 
     df = df.copy()
+    rev = df['revenue'].to_numpy(dtype=np.float64)
+    avg_revenue = rev.mean()
 
     # Calculate trend direction using linear regression
     if len(df) >= 3:
         x = np.arange(len(df))
-        y = df['revenue'].values
-        slope, _ = np.polyfit(x, y, 1)
-        avg_revenue = df['revenue'].mean()
+        slope, _ = np.polyfit(x, rev, 1)
 
         if avg_revenue > 0:
             trend_pct = (slope * len(df)) / avg_revenue
@@ -67,48 +96,48 @@ def analyze_revenue_trend(df: pd.DataFrame) -> Dict:
         trend_confidence = 50
 
     # Calculate percentiles for segmentation
-    p80 = df['revenue'].quantile(0.80)
-    p20 = df['revenue'].quantile(0.20)
-    avg_revenue = df['revenue'].mean()
-    std_revenue = df['revenue'].std()
+    p20, p80 = np.quantile(rev, [0.20, 0.80])
+    std_revenue = rev.std(ddof=1) if len(rev) > 1 else np.nan
 
     # Segment: Max=top 20%, Min=bottom 20%, Middle=rest
-    def label_segment(revenue):
-        if p80 == p20:  # All values are the same
-            return 'Middle'
-        if revenue >= p80:
-            return 'Max'
-        elif revenue <= p20:
-            return 'Min'
-        else:
-            return 'Middle'
-
-    df['segment'] = df['revenue'].apply(label_segment)
+    if p80 == p20:  # All values are the same
+        segment_codes = np.ones(len(rev), dtype=np.int8)
+    else:
+        segment_codes = _segment_codes(rev >= p80, rev <= p20)
+    df['segment'] = pd.Categorical.from_codes(segment_codes, categories=REVENUE_SEGMENTS)
 
     # Calculate z-scores for anomaly detection
     if std_revenue > 0:
-        df['z_score'] = (df['revenue'] - avg_revenue) / std_revenue
+        df['z_score'] = (rev - avg_revenue) / std_revenue
     else:
-        df['z_score'] = 0
+        df['z_score'] = 0.0
 
     # Get top 3 days by revenue
-    top_3_days = df.nlargest(3, 'revenue')[['date', 'platform', 'revenue', 'orders', 'segment']].copy()
+    top_3_days = df.iloc[_top_k_indices(rev, 3)][['date', 'platform', 'revenue', 'orders', 'segment']].copy()
 
-    # Get abnormally low days (z-score < -2)
-    low_anomaly_days = df[df['z_score'] < -2][['date', 'platform', 'revenue', 'orders', 'z_score']].copy()
+    # Get abnormally low days (z-score < -2); flat data has none
+    if std_revenue > 0:
+        low_anomaly_days = df[df['z_score'] < -2][['date', 'platform', 'revenue', 'orders', 'z_score']].copy()
+    else:
+        low_anomaly_days = df.iloc[:0][['date', 'platform', 'revenue', 'orders', 'z_score']].copy()
 
     # Calculate segment statistics
-    segment_stats = {}
-    for segment in ['Max', 'Middle', 'Min']:
-        segment_df = df[df['segment'] == segment]
-        if not segment_df.empty:
-            segment_stats[segment] = {
-                'count': len(segment_df),
-                'total_revenue': segment_df['revenue'].sum(),
-                'avg_revenue': segment_df['revenue'].mean(),
-                'total_orders': segment_df['orders'].sum(),
-                'pct_of_days': len(segment_df) / len(df) * 100
-            }
+    agg_df = df.groupby('segment', observed=True).agg(
+        count=('revenue', 'size'),
+        total_revenue=('revenue', 'sum'),
+        avg_revenue=('revenue', 'mean'),
+        total_orders=('orders', 'sum')
+    )
+    segment_stats = {
+        row.Index: {
+            'count': row.count,
+            'total_revenue': row.total_revenue,
+            'avg_revenue': row.avg_revenue,
+            'total_orders': row.total_orders,
+            'pct_of_days': row.count / len(df) * 100
+        }
+        for row in agg_df.itertuples()
+    }
 
     return {
         'trend_direction': trend_direction,
@@ -154,50 +183,65 @@ def analyze_aov(df: pd.DataFrame, orders_df: pd.DataFrame = None) -> Dict:
             'segment_stats': {}
         }
 
-    df = df.copy()
-
     # Calculate average AOV
-    avg_aov = df['aov'].mean()
+    aov = df['aov'].to_numpy()
+    avg_aov = float(aov.mean())
 
     # Define thresholds
     max_threshold = avg_aov * 1.2  # +20% above average
     min_threshold = avg_aov * 0.8  # -20% below average
 
-    # Segment AOV
-    def label_aov_segment(aov):
-        if aov >= max_threshold:
-            return 'Max'
-        elif aov <= min_threshold:
-            return 'Min'
-        else:
-            return 'Middle'
-
-    df['segment'] = df['aov'].apply(label_aov_segment)
+    # Segment AOV (int codes into REVENUE_SEGMENTS)
+    segment_codes = _segment_codes(aov >= max_threshold, aov <= min_threshold)
+    df = df.assign(segment=pd.Categorical.from_codes(segment_codes, categories=REVENUE_SEGMENTS))
 
     # Get top 3 and bottom 3 AOV days
-    top_3_aov_days = df.nlargest(3, 'aov')[['date', 'platform', 'aov', 'revenue', 'orders', 'segment']].copy()
-    low_3_aov_days = df.nsmallest(3, 'aov')[['date', 'platform', 'aov', 'revenue', 'orders', 'segment']].copy()
+    aov_cols = ['date', 'platform', 'aov', 'revenue', 'orders', 'segment']
+    top_3_aov_days = df.iloc[_top_k_indices(aov, 3)][aov_cols].copy()
+    low_3_aov_days = df.iloc[_top_k_indices(aov, 3, largest=False)][aov_cols].copy()
 
     # Infer activity context if order data is provided
     activity_context = {}
     if orders_df is not None and not orders_df.empty:
-        for _, row in pd.concat([top_3_aov_days, low_3_aov_days]).iterrows():
-            date_val = row['date']
-            activities = infer_activity_context(date_val, orders_df)
-            activity_context[str(date_val)] = activities
+        # A day can be in both top and bottom 3; dedupe while keeping order
+        selected_dates = list(dict.fromkeys(chain(top_3_aov_days['date'], low_3_aov_days['date'])))
+
+        if 'created_at' in orders_df.columns and 'date' in orders_df.columns:
+            # Parse order hours once, only for the days we inspect
+            orders_df = orders_df[orders_df['date'].isin(selected_dates)]
+            orders_df = orders_df.assign(
+                _hour=pd.to_datetime(orders_df['created_at'], errors='coerce').dt.hour
+            )
+
+        # Index orders by date once instead of rescanning per date
+        if 'date' in orders_df.columns:
+            orders_by_date = dict(iter(orders_df.groupby('date', sort=False)))
+        else:
+            orders_by_date = {}
+
+        for date_val in selected_dates:
+            activity_context[str(date_val)] = infer_day_activity(orders_by_date.get(date_val))
 
     # Calculate segment statistics
-    segment_stats = {}
-    for segment in ['Max', 'Middle', 'Min']:
-        segment_df = df[df['segment'] == segment]
-        if not segment_df.empty:
-            segment_stats[segment] = {
-                'count': len(segment_df),
-                'avg_aov': segment_df['aov'].mean(),
-                'total_revenue': segment_df['revenue'].sum(),
-                'total_orders': segment_df['orders'].sum(),
-                'pct_of_days': len(segment_df) / len(df) * 100
-            }
+    # Per-segment sums straight from the int codes (no groupby hash build)
+    counts = np.bincount(segment_codes, minlength=3)
+    aov_sums = np.bincount(segment_codes, weights=aov, minlength=3)
+    revenue_sums = np.bincount(segment_codes, weights=df['revenue'].to_numpy(dtype=np.float64), minlength=3)
+    order_sums = np.bincount(segment_codes, weights=df['orders'].to_numpy(dtype=np.float64), minlength=3)
+    if pd.api.types.is_integer_dtype(df['orders']):
+        order_sums = order_sums.round().astype(np.int64)
+
+    segment_stats = {
+        segment: {
+            'count': int(counts[i]),
+            'avg_aov': aov_sums[i] / counts[i],
+            'total_revenue': revenue_sums[i],
+            'total_orders': order_sums[i],
+            'pct_of_days': counts[i] / len(df) * 100
+        }
+        for i, segment in enumerate(REVENUE_SEGMENTS)
+        if counts[i] > 0
+    }
 
     return {
         'top_3_aov_days': top_3_aov_days,
@@ -230,51 +274,84 @@ def infer_activity_context(date_val, orders_df: pd.DataFrame) -> List[str]:
     Returns:
         List of inferred activity types
     """
-    activities = []
-
     # Filter orders for the specific date
-    if 'date' in orders_df.columns:
-        day_orders = orders_df[orders_df['date'] == date_val].copy()
-    else:
+    if 'date' not in orders_df.columns:
         return ['Normal']
 
-    if day_orders.empty:
-        return ['Normal']
+    return infer_day_activity(orders_df[orders_df['date'] == date_val])
+
+
+def infer_day_activity(day_orders: Optional[pd.DataFrame]) -> List[str]:
+    """
+    Infer activity types from orders already sliced to a single date.
+
+    Same rules as infer_activity_context, without the per-date filter.
+
+    Args:
+        day_orders: DataFrame with the orders of one day (or None)
 
-    # Check for bundles (multiple products per order)
-    if 'order_id' in day_orders.columns and 'product_name' in day_orders.columns:
-        order_product_counts = day_orders.groupby('order_id')['product_name'].nunique()
-        if len(order_product_counts) > 0:
-            bundle_rate = (order_product_counts > 1).mean()
-            if bundle_rate > 0.3:
-                activities.append('Bundle')
+    Returns:
+        List of inferred activity types
+    """
+    if day_orders is None or len(day_orders) == 0:
+        return ['Normal']
 
-    # Check for livestream (order volume spike in short time)
-    if 'created_at' in day_orders.columns and len(day_orders) > 5:
+    columns = day_orders.columns
+    n_rows = len(day_orders)
+    is_bundle = is_livestream = is_promotion = is_flash_sale = False
+
+    # Bundles: share of orders with 2+ distinct products
+    if 'order_id' in columns and 'product_name' in columns:
+        # Distinct (order, product) pairs via integer codes, then count per order
+        order_codes, order_ids = pd.factorize(day_orders['order_id'])
+        product_codes, _ = pd.factorize(day_orders['product_name'])
+        if len(order_ids) > 0:
+            width = max(product_codes.max() + 1, 1)
+            valid = (order_codes >= 0) & (product_codes >= 0)
+            pairs = np.unique(order_codes[valid].astype(np.int64) * width + product_codes[valid])
+            products_per_order = np.bincount(pairs // width, minlength=len(order_ids))
+            is_bundle = (products_per_order > 1).mean() > 0.3
+
+    # Livestream: order volume spike in short time
+    if 'created_at' in columns and n_rows > 5:
         try:
-            hourly_orders = day_orders.groupby(
-                pd.to_datetime(day_orders['created_at']).dt.hour
-            ).size()
-            if len(hourly_orders) > 0 and hourly_orders.mean() > 0:
-                if hourly_orders.max() > hourly_orders.mean() * 2:
-                    activities.append('Livestream')
+            if '_hour' in columns:
+                hours = day_orders['_hour']  # pre-parsed by analyze_aov
+            else:
+                hours = pd.to_datetime(day_orders['created_at']).dt.hour
+            hours = hours.to_numpy(dtype=np.float64)
+            hours = hours[~np.isnan(hours)].astype(np.int64)
+            # Orders per active hour (a 24-bin histogram instead of a groupby)
+            hourly_orders = np.bincount(hours, minlength=24)
+            hourly_orders = hourly_orders[hourly_orders > 0]
+            if hourly_orders.size > 0:
+                is_livestream = hourly_orders.max() > hourly_orders.mean() * 2
         except:
             pass
 
-    # Check for promotion (high quantity per order)
-    if 'quantity' in day_orders.columns:
-        high_qty_rate = (day_orders['quantity'] > 1).mean()
-        if high_qty_rate > 0.4:
-            activities.append('Promotion')
-
-    # Check for flash sale (high discount rate)
-    if 'subtotal_gross' in day_orders.columns and 'subtotal_net' in day_orders.columns:
-        valid_orders = day_orders[day_orders['subtotal_gross'] > 0]
-        if len(valid_orders) > 0:
-            discount_rate = 1 - (valid_orders['subtotal_net'].sum() / valid_orders['subtotal_gross'].sum())
-            if discount_rate > 0.3:  # More than 30% average discount
-                activities.append('Flash Sale')
-
+    # Promotion: high quantity per order
+    if 'quantity' in columns:
+        is_promotion = (day_orders['quantity'].to_numpy() > 1).mean() > 0.4
+
+    # Flash sale: high discount rate
+    if 'subtotal_gross' in columns and 'subtotal_net' in columns:
+        gross = day_orders['subtotal_gross'].to_numpy(dtype=np.float64)
+        net = day_orders['subtotal_net'].to_numpy(dtype=np.float64)
+        valid = gross > 0
+        gross_sum = gross[valid].sum()
+        if gross_sum > 0:
+            discount_rate = 1 - (np.nansum(net[valid]) / gross_sum)
+            is_flash_sale = discount_rate > 0.3  # More than 30% average discount
+
+    activities = [
+        name for name, detected in (
+            ('Bundle', is_bundle),
+            ('Livestream', is_livestream),
+            ('Promotion', is_promotion),
+            ('Flash Sale', is_flash_sale)
+        )
+        if detected
+    ]
     return activities if activities else ['Normal']
 
 
@@ -306,53 +383,51 @@ def analyze_product_matrix(df: pd.DataFrame) -> Dict:
             'segment_stats': {}
         }
 
-    df = df.copy()
-
     # Calculate percentiles
     revenue_p67 = df['revenue'].quantile(0.67)
     revenue_p33 = df['revenue'].quantile(0.33)
     quantity_median = df['quantity'].median()
 
-    # Categorize products
-    def label_product_segment(row):
-        if row['revenue'] >= revenue_p67:
-            return 'Hero'  # High revenue = Hero products (Max)
-        elif row['revenue'] <= revenue_p33 and row['quantity'] >= quantity_median:
-            return 'Volume'  # Low revenue but high quantity = Volume products (Min)
-        else:
-            return 'Core'  # Everything else = Core products (Middle)
-
-    df['segment'] = df.apply(label_product_segment, axis=1)
-
-    # Get quadrant distribution
-    quadrant_distribution = df['segment'].value_counts().to_dict()
+    # Categorize products:
+    # - Hero (Max): high revenue
+    # - Volume (Min): low revenue but high quantity
+    # - Core (Middle): everything else
+    rev = df['revenue'].to_numpy()
+    qty = df['quantity'].to_numpy()
+    hero_mask = rev >= revenue_p67
+    volume_mask = (rev <= revenue_p33) & (qty >= quantity_median)
+    segment_codes = _segment_codes(hero_mask, volume_mask)
+    df = df.assign(segment=pd.Categorical.from_codes(segment_codes, categories=PRODUCT_SEGMENTS))
+
+    # Get quadrant distribution (only segments that have products)
+    segment_counts = df['segment'].value_counts()
+    quadrant_distribution = segment_counts[segment_counts > 0].to_dict()
 
     # Get top products from each segment
-    hero_products = df[df['segment'] == 'Hero']
-    volume_products = df[df['segment'] == 'Volume']
+    product_cols = ['product_name', 'platform', 'revenue', 'quantity', 'orders']
+    hero_idx = np.flatnonzero(segment_codes == 0)
+    volume_idx = np.flatnonzero(segment_codes == 2)
 
-    top_hero_products = hero_products.nlargest(5, 'revenue')[
-        ['product_name', 'platform', 'revenue', 'quantity', 'orders']
-    ].copy() if not hero_products.empty else pd.DataFrame()
+    top_hero_products = df.iloc[hero_idx[_top_k_indices(rev[hero_idx], 5)]][
+        product_cols
+    ].copy() if hero_idx.size else pd.DataFrame()
 
-    top_volume_products = volume_products.nlargest(5, 'quantity')[
-        ['product_name', 'platform', 'revenue', 'quantity', 'orders']
-    ].copy() if not volume_products.empty else pd.DataFrame()
+    top_volume_products = df.iloc[volume_idx[_top_k_indices(qty[volume_idx], 5)]][
+        product_cols
+    ].copy() if volume_idx.size else pd.DataFrame()
 
     # Calculate segment statistics
-    segment_stats = {}
-    for segment in ['Hero', 'Core', 'Volume']:
-        segment_df = df[df['segment'] == segment]
-        if not segment_df.empty:
-            segment_stats[segment] = {
-                'count': len(segment_df),
-                'total_revenue': segment_df['revenue'].sum(),
-                'avg_revenue': segment_df['revenue'].mean(),
-                'total_quantity': segment_df['quantity'].sum(),
-                'avg_quantity': segment_df['quantity'].mean(),
-                'pct_of_products': len(segment_df) / len(df) * 100,
-                'pct_of_revenue': segment_df['revenue'].sum() / df['revenue'].sum() * 100 if df['revenue'].sum() > 0 else 0
-            }
+    grouped = df.groupby('segment', observed=True).agg(
+        count=('revenue', 'size'),
+        total_revenue=('revenue', 'sum'),
+        avg_revenue=('revenue', 'mean'),
+        total_quantity=('quantity', 'sum'),
+        avg_quantity=('quantity', 'mean')
+    )
+    total_revenue = grouped['total_revenue'].sum()
+    grouped['pct_of_products'] = grouped['count'] / len(df) * 100
+    grouped['pct_of_revenue'] = grouped['total_revenue'] / total_revenue * 100 if total_revenue > 0 else 0
+    segment_stats = grouped.to_dict(orient='index')
 
     return {
         'segments': df,
@@ -372,6 +447,61 @@ def analyze_product_matrix(df: pd.DataFrame) -> Dict:
 # Section 4: Product Mix Percentage (Portfolio Health)
 # =============================================================================
 
+def _build_risk_table() -> Dict[Tuple[int, int, int], Tuple[str, Tuple[str, ...], Tuple[str, ...]]]:
+    """
+    Precompute product-mix risk outcomes for every threshold combination.
+
+    Keys are (hero_bucket, core_weak, volume_low) where hero_bucket is
+    2 for Hero > 60%, 1 for Hero > 50%, else 0. Values hold the risk level,
+    risk factor templates (formatted with hero/core/volume percentages)
+    and recommendations.
+    """
+    table = {}
+    for hero_bucket in (0, 1, 2):
+        for core_weak in (0, 1):
+            for volume_low in (0, 1):
+                risk_level = 'Low'
+                factors = []
+                recommendations = []
+
+                # Check for over-reliance on hero products
+                if hero_bucket == 2:
+                    risk_level = 'High'
+                    factors.append("Over-reliance on hero products: {hero:.1f}% of revenue")
+                    recommendations.append("Diversify product portfolio - develop new core products")
+                    recommendations.append("Reduce dependency on top-selling products")
+                elif hero_bucket == 1:
+                    risk_level = 'Medium'
+                    factors.append("High dependency on hero products: {hero:.1f}% of revenue")
+                    recommendations.append("Consider expanding core product line")
+
+                # Check for weak core products
+                if core_weak:
+                    if risk_level == 'Low':
+                        risk_level = 'Medium'
+                    factors.append("Weak core product segment: only {core:.1f}% of revenue")
+                    recommendations.append("Urgent: Push core products through marketing campaigns")
+                    recommendations.append("Consider bundling core products with hero products")
+
+                # Check for volume products contribution
+                if volume_low:
+                    factors.append("Low volume product contribution: {volume:.1f}% of revenue")
+                    recommendations.append("Consider volume-based promotions to increase sales")
+
+                # If no risk factors, portfolio is healthy
+                if not factors:
+                    recommendations.append("Portfolio is well-balanced - maintain current strategy")
+                    recommendations.append("Continue monitoring product performance trends")
+
+                table[(hero_bucket, core_weak, volume_low)] = (
+                    risk_level, tuple(factors), tuple(recommendations)
+                )
+    return table
+
+
+_RISK_TABLE = _build_risk_table()
+
+
 def analyze_product_mix(df: pd.DataFrame) -> Dict:
     """
     Product mix analysis for portfolio health assessment.
@@ -410,48 +540,18 @@ def analyze_product_mix(df: pd.DataFrame) -> Dict:
         }
 
     # Calculate mix percentages
-    mix_percentages = {}
-    for segment in ['Hero', 'Core', 'Volume']:
-        segment_revenue = df[df['segment'] == segment]['revenue'].sum()
-        mix_percentages[segment] = (segment_revenue / total_revenue) * 100
-
-    # Assess risk
-    risk_factors = []
-    recommendations = []
-    risk_level = 'Low'
-
-    hero_pct = mix_percentages.get('Hero', 0)
-    core_pct = mix_percentages.get('Core', 0)
-    volume_pct = mix_percentages.get('Volume', 0)
-
-    # Check for over-reliance on hero products
-    if hero_pct > 60:
-        risk_level = 'High'
-        risk_factors.append(f"Over-reliance on hero products: {hero_pct:.1f}% of revenue")
-        recommendations.append("Diversify product portfolio - develop new core products")
-        recommendations.append("Reduce dependency on top-selling products")
-    elif hero_pct > 50:
-        risk_level = 'Medium'
-        risk_factors.append(f"High dependency on hero products: {hero_pct:.1f}% of revenue")
-        recommendations.append("Consider expanding core product line")
-
-    # Check for weak core products
-    if core_pct < 25:
-        if risk_level == 'Low':
-            risk_level = 'Medium'
-        risk_factors.append(f"Weak core product segment: only {core_pct:.1f}% of revenue")
-        recommendations.append("Urgent: Push core products through marketing campaigns")
-        recommendations.append("Consider bundling core products with hero products")
-
-    # Check for volume products contribution
-    if volume_pct < 10:
-        risk_factors.append(f"Low volume product contribution: {volume_pct:.1f}% of revenue")
-        recommendations.append("Consider volume-based promotions to increase sales")
-
-    # If no risk factors, portfolio is healthy
-    if not risk_factors:
-        recommendations.append("Portfolio is well-balanced - maintain current strategy")
-        recommendations.append("Continue monitoring product performance trends")
+    segment_revenue = df[['segment', 'revenue']].groupby('segment', observed=True, sort=False)['revenue'].sum()
+    mix_series = (segment_revenue / total_revenue * 100).reindex(PRODUCT_SEGMENTS, fill_value=0.0)
+    hero_pct, core_pct, volume_pct = mix_series.to_numpy()
+    mix_percentages = dict(zip(PRODUCT_SEGMENTS, mix_series.to_numpy()))
+
+    # Assess risk (outcome precomputed per threshold bucket in _RISK_TABLE)
+    hero_bucket = 2 if hero_pct > 60 else 1 if hero_pct > 50 else 0
+    risk_level, factor_templates, recommendations = _RISK_TABLE[
+        (hero_bucket, int(core_pct < 25), int(volume_pct < 10))
+    ]
+    risk_factors = [t.format(hero=hero_pct, core=core_pct, volume=volume_pct) for t in factor_templates]
+    recommendations = list(recommendations)
 
     return {
         'mix_percentages': mix_percentages,
@@ -470,6 +570,23 @@ def analyze_product_mix(df: pd.DataFrame) -> Dict:
 # Comprehensive Super Query
 # =============================================================================
 
+def _downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return df with orders/quantity as the smallest integer type.
+
+    revenue/aov stay float64: float32 keeps only ~7 significant digits, which
+    loses cents (and more) on currency totals.
+    """
+    if df.empty:
+        return df
+
+    columns = {}
+    for col in ('orders', 'quantity'):
+        if col in df.columns:
+            columns[col] = pd.to_numeric(df[col], downcast='integer')
+    return df.assign(**columns) if columns else df
+
+
 def run_super_query(
     revenue_df: pd.DataFrame,
     product_df: pd.DataFrame,
@@ -488,6 +605,10 @@ def run_super_query(
     """
     results = {}
 
+    # Narrow the count columns once; currency columns keep full precision
+    revenue_df = _downcast_numeric(revenue_df)
+    product_df = _downcast_numeric(product_df)
+
     # Section 1: Revenue Over Time
     results['revenue_analysis'] = analyze_revenue_trend(revenue_df)
 
@@ -495,10 +616,11 @@ def run_super_query(
     if 'aov' in revenue_df.columns:
         results['aov_analysis'] = analyze_aov(revenue_df, orders_df)
     else:
-        # Calculate AOV if not present
-        revenue_df_copy = revenue_df.copy()
-        revenue_df_copy['aov'] = revenue_df_copy['revenue'] / revenue_df_copy['orders'].replace(0, 1)
-        results['aov_analysis'] = analyze_aov(revenue_df_copy, orders_df)
+        # Calculate AOV if not present (assign avoids copying the other columns)
+        revenue_with_aov = revenue_df.assign(
+            aov=revenue_df['revenue'] / revenue_df['orders'].replace(0, 1)
+        )
+        results['aov_analysis'] = analyze_aov(revenue_with_aov, orders_df)
 
     # Section 3: Product Matrix
     product_matrix_result = analyze_product_matrix(product_df)
@@ -2,20 +2,44 @@
 Portfolio Health chart component.
 """
 
-import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
 from typing import Optional, Dict
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import COLORS
 from data.time_utils import calculate_change
-from components.product_matrix import calculate_product_segments
+from components.product_matrix import MATRIX_SEGMENTS, calculate_product_segments
+
+# Revenue split rows: (segment, label, color)
+_SPLIT_SEGMENTS = (
+    ('Max (Hero)', 'Hero', COLORS['Max']),
+    ('Middle (Core)', 'Core', COLORS['Middle']),
+    ('Min (Volume)', 'Volume', COLORS['Min']),
+)
+
+# Panel HTML: colors are filled in once at import, per-render values with str.format
+_RISK_CARD = f"""
+<div style="margin-bottom: 16px; padding: 12px 16px; background: linear-gradient(135deg, rgba(255,255,255,0.9) 0%, rgba(248,250,252,0.9) 100%); border-radius: 12px; border: 1px solid {COLORS['Border']};">
+    <span style="font-size: 11px; color: {COLORS['TextMuted']}; text-transform: uppercase; letter-spacing: 0.5px;">Risk Level</span><br>
+    <span style="font-size: 20px; font-weight: 700; color: {{risk_color}};">{{risk_level}}</span>
+</div>
+"""
+
+_SPLIT_HEADER = f"""
+<div style="font-size: 12px; font-weight: 600; color: {COLORS['Text']}; margin-bottom: 10px; text-transform: uppercase; letter-spacing: 0.5px;">
+    Revenue Split
+</div>"""
+
+_SPLIT_ROW = f"""
+<div style="display: flex; align-items: center; gap: 10px; margin-bottom: 8px; padding: 8px 12px; background: rgba(255,255,255,0.7); border-radius: 8px; border: 1px solid {COLORS['Border']};">
+    <div style="width: 12px; height: 12px; background: {{color}}; border-radius: 4px; box-shadow: 0 2px 4px {{color}}40;"></div>
+    <span style="font-size: 13px; color: {COLORS['Text']};"><b>{{label}}</b>: {{revenue:,.0f}} ({{pct:.1f}}%){{delta}}</span>
+</div>"""
 
+_SPLIT_DELTA = " <span style='font-size: 10px; color: {color}; font-weight: 500;'>({arrow}{change:.1f}%)</span>"
 
+
+@st.fragment
 def render_portfolio_health(
     current_data: pd.DataFrame,
     previous_data: Optional[pd.DataFrame] = None,
@@ -27,7 +51,10 @@ def render_portfolio_health(
         st.info("No portfolio data available.")
         return
 
-    current_data = calculate_product_segments(current_data)
+    has_prev = bool(show_comparison and previous_data is not None and len(previous_data))
+
+    if 'matrix_segment' not in current_data.columns:
+        current_data = calculate_product_segments(current_data)
     segments = calculate_segment_distribution(current_data)
     risk_level = determine_risk_level(segments)
     recommendation = get_recommendation(segments, risk_level)
@@ -50,13 +77,60 @@ def render_portfolio_health(
     labels_f, values_f, colors_f = zip(*non_zero)
     total_revenue = sum(values)
 
+    col1, col2 = st.columns([1, 1.5])
+
+    with col1:
+        st.plotly_chart(_build_health_figure(labels_f, values_f, colors_f, total_revenue), use_container_width=True)
+
+    with col2:
+        # Risk level with Soft UI styling
+        risk_colors = {'Low': COLORS['Max'], 'Medium': '#F59E0B', 'High': COLORS['Min']}
+        risk_color = risk_colors.get(risk_level, COLORS['Middle'])
+
+        st.markdown(_RISK_CARD.format(risk_color=risk_color, risk_level=risk_level), unsafe_allow_html=True)
+
+        # Previous-period split, computed once for all segments
+        prev_seg = None
+        if has_prev:
+            if 'matrix_segment' not in previous_data.columns:
+                previous_data = calculate_product_segments(previous_data)
+            prev_seg = calculate_segment_distribution(previous_data)
+
+        # Segment breakdown with modern styling, sent as one element
+        html = [_SPLIT_HEADER]
+
+        for seg, label, color in _SPLIT_SEGMENTS:
+            data = segments.get(seg, {'revenue': 0, 'percentage': 0})
+
+            pct = data['percentage']
+            delta_str = ""
+
+            if prev_seg is not None:
+                prev_pct = prev_seg.get(seg, {}).get('percentage', 0)
+                change = calculate_change(pct, prev_pct)
+                if change['status'] != 'no_change':
+                    arrow = '+' if change['percentage'] > 0 else ''
+                    delta_str = _SPLIT_DELTA.format(color=color, arrow=arrow, change=change['percentage'])
+
+            html.append(_SPLIT_ROW.format(color=color, label=label, revenue=data['revenue'], pct=pct, delta=delta_str))
+        st.markdown("".join(html), unsafe_allow_html=True)
+
+        st.markdown("")
+        st.info(f"{recommendation}")
+
+
+@st.cache_data(ttl="10m", max_entries=64, show_spinner=False)
+def _build_health_figure(labels: tuple, values: tuple, colors: tuple, total_revenue: float) -> dict:
+    """Build the revenue split donut; cached as the figure dict so reruns skip building it."""
+    import plotly.graph_objects as go
+
     fig = go.Figure()
 
     fig.add_trace(go.Pie(
-        labels=labels_f,
-        values=values_f,
+        labels=labels,
+        values=values,
         hole=0.65,
-        marker_colors=colors_f,
+        marker_colors=colors,
         textinfo='percent',
         textposition='outside',
         textfont=dict(size=12, color=COLORS['Text']),
@@ -85,54 +159,7 @@ def render_portfolio_health(
         font=dict(color=COLORS['Text'])
     )
 
-    col1, col2 = st.columns([1, 1.5])
-
-    with col1:
-        st.plotly_chart(fig, use_container_width=True)
-
-    with col2:
-        # Risk level with Soft UI styling
-        risk_colors = {'Low': COLORS['Max'], 'Medium': '#F59E0B', 'High': COLORS['Min']}
-        risk_color = risk_colors.get(risk_level, COLORS['Middle'])
-
-        st.markdown(f"""
-        <div style="margin-bottom: 16px; padding: 12px 16px; background: linear-gradient(135deg, rgba(255,255,255,0.9) 0%, rgba(248,250,252,0.9) 100%); border-radius: 12px; border: 1px solid {COLORS['Border']};">
-            <span style="font-size: 11px; color: {COLORS['TextMuted']}; text-transform: uppercase; letter-spacing: 0.5px;">Risk Level</span><br>
-            <span style="font-size: 20px; font-weight: 700; color: {risk_color};">{risk_level}</span>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # Segment breakdown with modern styling
-        st.markdown(f"""
-        <div style="font-size: 12px; font-weight: 600; color: {COLORS['Text']}; margin-bottom: 10px; text-transform: uppercase; letter-spacing: 0.5px;">
-            Revenue Split
-        </div>
-        """, unsafe_allow_html=True)
-
-        for seg, label in [('Max (Hero)', 'Hero'), ('Middle (Core)', 'Core'), ('Min (Volume)', 'Volume')]:
-            data = segments.get(seg, {'revenue': 0, 'percentage': 0})
-            color = {'Hero': COLORS['Max'], 'Core': COLORS['Middle'], 'Volume': COLORS['Min']}[label]
-
-            pct = data['percentage']
-            delta_str = ""
-
-            if show_comparison and previous_data is not None and not previous_data.empty:
-                prev_seg = calculate_segment_distribution(calculate_product_segments(previous_data))
-                prev_pct = prev_seg.get(seg, {}).get('percentage', 0)
-                change = calculate_change(pct, prev_pct)
-                if change['status'] != 'no_change':
-                    arrow = '+' if change['percentage'] > 0 else ''
-                    delta_str = f" <span style='font-size: 10px; color: {color}; font-weight: 500;'>({arrow}{change['percentage']:.1f}%)</span>"
-
-            st.markdown(f"""
-            <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 8px; padding: 8px 12px; background: rgba(255,255,255,0.7); border-radius: 8px; border: 1px solid {COLORS['Border']};">
-                <div style="width: 12px; height: 12px; background: {color}; border-radius: 4px; box-shadow: 0 2px 4px {color}40;"></div>
-                <span style="font-size: 13px; color: {COLORS['Text']};"><b>{label}</b>: {data['revenue']:,.0f} ({pct:.1f}%){delta_str}</span>
-            </div>
-            """, unsafe_allow_html=True)
-
-        st.markdown("")
-        st.info(f"{recommendation}")
+    return fig.to_plotly_json()
 
 
 def calculate_segment_distribution(df: pd.DataFrame) -> Dict:
@@ -140,15 +167,17 @@ def calculate_segment_distribution(df: pd.DataFrame) -> Dict:
     if df.empty:
         return {}
 
-    segment_rev = df.groupby('matrix_segment')['revenue'].sum()
+    segment_rev = (
+        df.groupby('matrix_segment', observed=False, sort=False)['revenue'].sum()
+        .reindex(MATRIX_SEGMENTS, fill_value=0)
+    )
     total = segment_rev.sum()
 
     if total == 0:
         return {}
 
     segments = {}
-    for seg in ['Max (Hero)', 'Middle (Core)', 'Min (Volume)']:
-        rev = segment_rev.get(seg, 0)
+    for seg, rev in segment_rev.items():
         segments[seg] = {'revenue': rev, 'percentage': (rev / total) * 100}
 
     return segments
@@ -187,7 +216,8 @@ def render_segment_breakdown(
     if current_data.empty:
         return
 
-    current_data = calculate_product_segments(current_data)
+    if 'matrix_segment' not in current_data.columns:
+        current_data = calculate_product_segments(current_data)
 
     st.markdown("### Top Products by Segment")
 
@@ -204,4 +234,5 @@ def render_segment_breakdown(
                 display_df['revenue'] = display_df['revenue'].apply(lambda x: f"{x:,.0f}")
                 display_df.columns = ['Product', 'Platform', 'Revenue', 'Qty', 'Orders']
 
-                st.dataframe(display_df, use_container_width=True, hide_index=True)
+                # Static table: one markdown element instead of an Arrow-backed grid; styled by .seg-table
+                st.markdown(display_df.to_html(index=False, border=0, classes='seg-table'), unsafe_allow_html=True)
@@ -2,19 +2,60 @@
 Revenue Trends chart component.
 """
 
-import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
 from typing import Optional
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import COLORS
 from data.time_utils import calculate_change
 
+# Insight HTML: colors are filled in once at import, per-render values with str.format
+_SEGMENT_DEFINITIONS = f"""
+<div style="background: linear-gradient(135deg, rgba(74, 124, 111, 0.05) 0%, rgba(96, 165, 250, 0.05) 100%);
+            border: 1px solid {COLORS['Border']}; border-radius: 12px; padding: 1rem; margin-top: 0.5rem;">
+    <div style="font-size: 0.75rem; font-weight: 600; color: {COLORS['TextSection']}; margin-bottom: 0.75rem;
+         text-transform: uppercase; letter-spacing: 0.5px;">Segment Definitions</div>
+    <div style="display: flex; gap: 1rem; flex-wrap: wrap; margin-bottom: 1rem;">
+        <div style="display: flex; align-items: center; gap: 6px;">
+            <div style="width: 10px; height: 10px; background: {COLORS['Max']}; border-radius: 3px;"></div>
+            <span style="font-size: 0.8rem; color: {COLORS['Text']};"><b>Max:</b> Top 20% highest revenue days</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 6px;">
+            <div style="width: 10px; height: 10px; background: {COLORS['Middle']}; border-radius: 3px;"></div>
+            <span style="font-size: 0.8rem; color: {COLORS['Text']};"><b>Middle:</b> Average revenue days</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 6px;">
+            <div style="width: 10px; height: 10px; background: {COLORS['Min']}; border-radius: 3px;"></div>
+            <span style="font-size: 0.8rem; color: {COLORS['Text']};"><b>Min:</b> Bottom 20% lowest revenue days</span>
+        </div>
+    </div>
+</div>
+"""
 
+_TOP_DAYS_HEADER = f"""
+<div style="background: rgba(16, 185, 129, 0.08); border: 1px solid rgba(16, 185, 129, 0.3);
+            border-radius: 8px; padding: 0.75rem;">
+    <div style="font-size: 0.7rem; font-weight: 600; color: {COLORS['Max']}; margin-bottom: 0.5rem;
+         text-transform: uppercase;">Top 3 Highest Revenue Days</div>
+</div>"""
+
+_LOW_DAYS_HEADER = f"""
+<div style="background: rgba(249, 115, 22, 0.08); border: 1px solid rgba(249, 115, 22, 0.3);
+            border-radius: 8px; padding: 0.75rem;">
+    <div style="font-size: 0.7rem; font-weight: 600; color: {COLORS['Min']}; margin-bottom: 0.5rem;
+         text-transform: uppercase;">Dates with Abnormally Low Revenue</div>
+</div>"""
+
+_DAY_ROW = f"""
+<div style="padding: 0.5rem 0; border-bottom: 1px solid {COLORS['Border']};">
+    <span style="font-weight: 600; color: {COLORS['Text']};">{{period}}</span>
+    <span style="color: {COLORS['TextLight']}; font-size: 0.8rem;"> ({{platform}})</span><br>
+    <span style="color: {{accent}}; font-weight: 500;">{{revenue:,.0f}}</span>
+    <span style="color: {COLORS['TextMuted']}; font-size: 0.75rem;"> | {{orders:,}} orders</span>
+</div>"""
+
+
+@st.fragment
 def render_revenue_chart(
     current_data: pd.DataFrame,
     previous_data: Optional[pd.DataFrame] = None,
@@ -26,8 +67,11 @@ def render_revenue_chart(
         st.info("No revenue data available for the selected period.")
         return
 
+    has_prev = bool(show_comparison and previous_data is not None and len(previous_data))
+
+    import plotly.graph_objects as go
+
     fig = go.Figure()
-    platforms = current_data['platform'].unique()
 
     # Platform colors - use theme colors instead of black
     platform_colors = {
@@ -35,9 +79,10 @@ def render_revenue_chart(
         'Shopee': '#E85A4F'   # Coral
     }
 
-    # Current period traces
-    for platform in platforms:
-        platform_data = current_data[current_data['platform'] == platform].copy()
+    # Current period traces; one groupby pass instead of a mask per platform
+    platforms = []
+    for platform, platform_data in current_data.groupby('platform', sort=False):
+        platforms.append(platform)
         platform_data = platform_data.sort_values('period')
 
         platform_color = platform_colors.get(platform, COLORS['Primary'])
@@ -60,10 +105,12 @@ def render_revenue_chart(
         ))
 
     # Previous period traces (dashed)
-    if show_comparison and previous_data is not None and not previous_data.empty:
+    if has_prev:
+        prev_groups = dict(tuple(previous_data.groupby('platform', sort=False)))
         for platform in platforms:
-            platform_data = previous_data[previous_data['platform'] == platform].copy()
-            platform_data = platform_data.sort_values('period')
+            if platform not in prev_groups:
+                continue
+            platform_data = prev_groups[platform].sort_values('period')
 
             platform_color = platform_colors.get(platform, COLORS['Primary'])
 
@@ -106,13 +153,14 @@ def render_revenue_chart(
     # Summary row
     total_revenue = current_data['revenue'].sum()
     total_orders = current_data['orders'].sum()
-    max_days = len(current_data[current_data['revenue_segment'] == 'Max'])
-    min_days = len(current_data[current_data['revenue_segment'] == 'Min'])
+    segment_counts = current_data['revenue_segment'].value_counts()
+    max_days = int(segment_counts.get('Max', 0))
+    min_days = int(segment_counts.get('Min', 0))
 
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        if show_comparison and previous_data is not None and not previous_data.empty:
+        if has_prev:
             prev = previous_data['revenue'].sum()
             change = calculate_change(total_revenue, prev)
             st.metric("Total Revenue", f"{total_revenue:,.0f}", delta=f"{change['percentage']:+.1f}%")
@@ -146,85 +194,20 @@ def render_revenue_insights(df: pd.DataFrame):
     low_days = df.nsmallest(3, 'revenue')[['period', 'revenue', 'orders', 'platform']].copy()
     low_days['period'] = low_days['period'].astype(str)
 
-    st.markdown(f"""
-    <div style="background: linear-gradient(135deg, rgba(74, 124, 111, 0.05) 0%, rgba(96, 165, 250, 0.05) 100%);
-                border: 1px solid {COLORS['Border']}; border-radius: 12px; padding: 1rem; margin-top: 0.5rem;">
-        <div style="font-size: 0.75rem; font-weight: 600; color: {COLORS['TextSection']}; margin-bottom: 0.75rem;
-             text-transform: uppercase; letter-spacing: 0.5px;">Segment Definitions</div>
-        <div style="display: flex; gap: 1rem; flex-wrap: wrap; margin-bottom: 1rem;">
-            <div style="display: flex; align-items: center; gap: 6px;">
-                <div style="width: 10px; height: 10px; background: {COLORS['Max']}; border-radius: 3px;"></div>
-                <span style="font-size: 0.8rem; color: {COLORS['Text']};"><b>Max:</b> Top 20% highest revenue days</span>
-            </div>
-            <div style="display: flex; align-items: center; gap: 6px;">
-                <div style="width: 10px; height: 10px; background: {COLORS['Middle']}; border-radius: 3px;"></div>
-                <span style="font-size: 0.8rem; color: {COLORS['Text']};"><b>Middle:</b> Average revenue days</span>
-            </div>
-            <div style="display: flex; align-items: center; gap: 6px;">
-                <div style="width: 10px; height: 10px; background: {COLORS['Min']}; border-radius: 3px;"></div>
-                <span style="font-size: 0.8rem; color: {COLORS['Text']};"><b>Min:</b> Bottom 20% lowest revenue days</span>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_SEGMENT_DEFINITIONS, unsafe_allow_html=True)
 
     col1, col2 = st.columns(2)
 
     with col1:
-        st.markdown(f"""
-        <div style="background: rgba(16, 185, 129, 0.08); border: 1px solid rgba(16, 185, 129, 0.3);
-                    border-radius: 8px; padding: 0.75rem;">
-            <div style="font-size: 0.7rem; font-weight: 600; color: {COLORS['Max']}; margin-bottom: 0.5rem;
-                 text-transform: uppercase;">Top 3 Highest Revenue Days</div>
-        </div>
-        """, unsafe_allow_html=True)
-        for _, row in top_days.iterrows():
-            st.markdown(f"""
-            <div style="padding: 0.5rem 0; border-bottom: 1px solid {COLORS['Border']};">
-                <span style="font-weight: 600; color: {COLORS['Text']};">{row['period']}</span>
-                <span style="color: {COLORS['TextLight']}; font-size: 0.8rem;"> ({row['platform']})</span><br>
-                <span style="color: {COLORS['Max']}; font-weight: 500;">{row['revenue']:,.0f}</span>
-                <span style="color: {COLORS['TextMuted']}; font-size: 0.75rem;"> | {row['orders']:,} orders</span>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(_TOP_DAYS_HEADER + _day_rows(top_days, COLORS['Max']), unsafe_allow_html=True)
 
     with col2:
-        st.markdown(f"""
-        <div style="background: rgba(249, 115, 22, 0.08); border: 1px solid rgba(249, 115, 22, 0.3);
-                    border-radius: 8px; padding: 0.75rem;">
-            <div style="font-size: 0.7rem; font-weight: 600; color: {COLORS['Min']}; margin-bottom: 0.5rem;
-                 text-transform: uppercase;">Dates with Abnormally Low Revenue</div>
-        </div>
-        """, unsafe_allow_html=True)
-        for _, row in low_days.iterrows():
-            st.markdown(f"""
-            <div style="padding: 0.5rem 0; border-bottom: 1px solid {COLORS['Border']};">
-                <span style="font-weight: 600; color: {COLORS['Text']};">{row['period']}</span>
-                <span style="color: {COLORS['TextLight']}; font-size: 0.8rem;"> ({row['platform']})</span><br>
-                <span style="color: {COLORS['Min']}; font-weight: 500;">{row['revenue']:,.0f}</span>
-                <span style="color: {COLORS['TextMuted']}; font-size: 0.75rem;"> | {row['orders']:,} orders</span>
-            </div>
-            """, unsafe_allow_html=True)
-
-
-def calculate_revenue_segments(df: pd.DataFrame) -> pd.DataFrame:
-    """Calculate revenue segments."""
-    if df.empty:
-        return df
+        st.markdown(_LOW_DAYS_HEADER + _day_rows(low_days, COLORS['Min']), unsafe_allow_html=True)
 
-    df = df.copy()
 
-    for platform in df['platform'].unique():
-        mask = df['platform'] == platform
-        data = df.loc[mask, 'revenue']
-
-        if len(data) >= 5:
-            top = data.quantile(0.80)
-            bottom = data.quantile(0.20)
-            df.loc[mask, 'revenue_segment'] = data.apply(
-                lambda x: 'Max' if x > top else ('Min' if x < bottom else 'Middle')
-            )
-        else:
-            df.loc[mask, 'revenue_segment'] = 'Middle'
-
-    return df
+def _day_rows(days: pd.DataFrame, accent: str) -> str:
+    """HTML rows for the insight days, with the revenue in the accent color."""
+    return "".join(
+        _DAY_ROW.format(period=period, platform=platform, accent=accent, revenue=revenue, orders=orders)
+        for period, revenue, orders, platform in days.itertuples(index=False, name=None)
+    )
@@ -6,10 +6,6 @@ Light skincare theme styling.
 import streamlit as st
 from datetime import date, timedelta
 from typing import Dict
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import COLORS
 from data.time_utils import get_comparison_period, format_period_label
@@ -204,12 +200,15 @@ def render_sidebar(min_date: date, max_date: date) -> Dict:
 
     comparison_mode = comparison_options[comparison_label]
 
-    compare_start, compare_end = get_comparison_period(start_date, end_date, comparison_mode)
+    # Comparison dates are only computed when a comparison is selected
+    compare_start = compare_end = None
+    if comparison_mode != 'none':
+        compare_start, compare_end = get_comparison_period(start_date, end_date, comparison_mode)
 
-    if compare_start and compare_end:
-        compare_start = max(compare_start, min_date)
-        compare_end = min(compare_end, max_date)
-        st.sidebar.caption(f"vs {format_period_label(compare_start, compare_end)}")
+        if compare_start and compare_end:
+            compare_start = max(compare_start, min_date)
+            compare_end = min(compare_end, max_date)
+            st.sidebar.caption(f"vs {format_period_label(compare_start, compare_end)}")
 
     st.sidebar.markdown("""
     <div style="height: 1px; background: linear-gradient(90deg, transparent, #E2E8F0, transparent); margin: 1rem 0;"></div>
@@ -242,29 +241,6 @@ def render_sidebar(min_date: date, max_date: date) -> Dict:
     <div style="height: 1px; background: linear-gradient(90deg, transparent, #E2E8F0, transparent); margin: 1rem 0;"></div>
     """, unsafe_allow_html=True)
 
-    # ==========================================================================
-    # Platform Filter
-    # ==========================================================================
-    st.sidebar.markdown(f"""
-    <div style="font-size: 0.7rem; font-weight: 700; color: {COLORS['TextSection']};
-         text-transform: uppercase; letter-spacing: 1.5px; margin-bottom: 0.75rem; padding-left: 0.25rem;">
-        PLATFORM
-    </div>
-    """, unsafe_allow_html=True)
-
-    platform = st.sidebar.radio(
-        "Platform",
-        options=['All', 'TikTok', 'Shopee'],
-        index=0,
-        horizontal=True,
-        key='platform_radio',
-        label_visibility="collapsed"
-    )
-
-    st.sidebar.markdown("""
-    <div style="height: 1px; background: linear-gradient(90deg, transparent, #E2E8F0, transparent); margin: 1rem 0;"></div>
-    """, unsafe_allow_html=True)
-
     # ==========================================================================
     # Legend
     # ==========================================================================
@@ -298,8 +274,7 @@ def render_sidebar(min_date: date, max_date: date) -> Dict:
         'compare_start': compare_start,
         'compare_end': compare_end,
         'comparison_mode': comparison_mode,
-        'granularity': granularity,
-        'platform': platform
+        'granularity': granularity
     }
 
 
@@ -7,10 +7,6 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from typing import Dict, Optional
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import COLORS
 from data.database import (
@@ -129,6 +129,9 @@ AOV_LOW_MULTIPLIER = 0.8
 
 PRODUCT_REVENUE_TOP_PERCENTILE = 0.67
 
+# Charts with fewer points than this skip reference lines and annotations
+MIN_ANNOT_ROWS = 5
+
 # =============================================================================
 # Data Paths
 # =============================================================================
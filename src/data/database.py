@@ -5,6 +5,8 @@ Uses persistent database file for instant startup after first load.
 
 import os
 import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import duckdb
 import pandas as pd
 import streamlit as st
@@ -36,6 +38,7 @@ INCLUDED_STATUSES = EXCLUDED_STATUSES
 TIKTOK_INCLUDED_STATUSES = EXCLUDED_STATUSES
 
 _conn = None
+_thread_local = threading.local()
 
 # =============================================================================
 # TIKTOK COLUMN MAPPING
@@ -244,6 +247,20 @@ def get_connection():
     return conn
 
 
+def get_cursor():
+    """Get this thread's cursor on the shared connection.
+
+    DuckDB connections are not safe to share between threads; a cursor is an
+    independent connection to the same database, so queries run concurrently.
+    """
+    conn = get_connection()
+    # Re-open if the connection was replaced by refresh_database()
+    if getattr(_thread_local, 'conn', None) is not conn:
+        _thread_local.conn = conn
+        _thread_local.cursor = conn.cursor()
+    return _thread_local.cursor
+
+
 def init_database():
     """Initialize database schema with comprehensive fields."""
     conn = get_connection()
@@ -370,71 +387,130 @@ def _clean_string(value, max_len=None):
     return result
 
 
-def load_tiktok_files(conn) -> Tuple[int, int]:
-    """Load TikTok CSV files into database.
-    Returns (rows_loaded, duplicates_skipped)
+def _read_files(reader, files: list) -> list:
     """
-    files = get_data_files()['tiktok']
-    if not files:
-        return 0, 0
+    Parse data files on a thread pool, keeping file order for deduplication.
+
+    CSV parsing and file IO release the GIL, so multi-file loads overlap.
+    The reader returns None for files that are skipped or fail to parse.
+    """
+    if len(files) == 1:
+        dfs = [reader(files[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(8, len(files))) as pool:
+            dfs = list(pool.map(reader, files))
+    return [df for df in dfs if df is not None]
 
-    all_dfs = []
-    total_duplicates = 0
 
-    for filepath in files:
-        try:
-            # Read CSV
-            is_gzipped = filepath.endswith('.gz')
-            kwargs = {'low_memory': False}
-            if is_gzipped:
-                kwargs['compression'] = 'gzip'
+def _read_tiktok_file(filepath: str) -> Optional[pd.DataFrame]:
+    """Read and normalize one TikTok CSV export."""
+    try:
+        # Read CSV
+        is_gzipped = filepath.endswith('.gz')
+        kwargs = {'low_memory': False}
+        if is_gzipped:
+            kwargs['compression'] = 'gzip'
 
+        try:
+            df = pd.read_csv(filepath, encoding='utf-8', **kwargs)
+        except UnicodeDecodeError:
             try:
-                df = pd.read_csv(filepath, encoding='utf-8', **kwargs)
-            except UnicodeDecodeError:
-                try:
-                    df = pd.read_csv(filepath, encoding='utf-8-sig', **kwargs)
-                except:
-                    df = pd.read_csv(filepath, encoding='latin-1', **kwargs)
+                df = pd.read_csv(filepath, encoding='utf-8-sig', **kwargs)
+            except:
+                df = pd.read_csv(filepath, encoding='latin-1', **kwargs)
 
-            df.columns = df.columns.str.strip()
+        df.columns = df.columns.str.strip()
 
-            if 'Product Name' not in df.columns or 'Order ID' not in df.columns:
-                print(f"Skipping {filepath}: missing required columns")
-                continue
+        if 'Product Name' not in df.columns or 'Order ID' not in df.columns:
+            print(f"Skipping {filepath}: missing required columns")
+            return None
 
-            # Filter blacklisted products (only apple, iphone, ipad)
-            before_filter = len(df)
-            df = df[~df['Product Name'].fillna('').apply(is_blacklisted)]
-            if df.empty:
-                continue
+        # Filter blacklisted products (only apple, iphone, ipad)
+        df = df[~df['Product Name'].fillna('').apply(is_blacklisted)]
+        if df.empty:
+            return None
 
-            # Rename columns according to mapping
-            df = df.rename(columns=TIKTOK_COLUMN_MAP)
+        # Rename columns according to mapping
+        df = df.rename(columns=TIKTOK_COLUMN_MAP)
 
-            # Add platform
-            df['platform'] = 'TikTok'
+        # Add platform
+        df['platform'] = 'TikTok'
 
-            # Parse created_at date
-            df['created_at_dt'] = df['created_at'].apply(_parse_tiktok_date)
-            df = df[df['created_at_dt'].notna()]
-            if df.empty:
-                continue
+        # Parse created_at date
+        df['created_at_dt'] = df['created_at'].apply(_parse_tiktok_date)
+        df = df[df['created_at_dt'].notna()]
+        if df.empty:
+            return None
 
-            df['created_at'] = df['created_at_dt']
-            df['date'] = df['created_at_dt'].dt.date
+        df['created_at'] = df['created_at_dt']
+        df['date'] = df['created_at_dt'].dt.date
 
-            # Remove empty order_ids
-            df['order_id'] = df['order_id'].astype(str).str.strip()
-            df = df[df['order_id'] != '']
-            if df.empty:
-                continue
+        # Remove empty order_ids
+        df['order_id'] = df['order_id'].astype(str).str.strip()
+        df = df[df['order_id'] != '']
+        if df.empty:
+            return None
 
-            all_dfs.append(df)
+        return df
 
-        except Exception as e:
-            print(f"Error loading {filepath}: {e}")
+    except Exception as e:
+        print(f"Error loading {filepath}: {e}")
+        return None
+
+
+def _read_shopee_file(filepath: str) -> Optional[pd.DataFrame]:
+    """Read and normalize one Shopee Excel export."""
+    try:
+        df = pd.read_excel(filepath)
+
+        # Check for required columns
+        required_cols = ['หมายเลขคำสั่งซื้อ', 'ชื่อสินค้า']
+        if not all(col in df.columns for col in required_cols):
+            print(f"Skipping {filepath}: missing required columns")
+            return None
+
+        # Filter blacklisted products (only apple, iphone, ipad)
+        df = df[~df['ชื่อสินค้า'].fillna('').apply(is_blacklisted)]
+        if df.empty:
+            return None
 
+        # Rename columns according to mapping
+        df = df.rename(columns=SHOPEE_COLUMN_MAP)
+
+        # Add platform
+        df['platform'] = 'Shopee'
+
+        # Parse created_at date
+        df['created_at_dt'] = df['created_at'].apply(_parse_shopee_date)
+        df = df[df['created_at_dt'].notna()]
+        if df.empty:
+            return None
+
+        df['created_at'] = df['created_at_dt']
+        df['date'] = df['created_at_dt'].dt.date
+
+        # Remove empty order_ids
+        df['order_id'] = df['order_id'].astype(str).str.strip()
+        df = df[df['order_id'] != '']
+        if df.empty:
+            return None
+
+        return df
+
+    except Exception as e:
+        print(f"Error loading {filepath}: {e}")
+        return None
+
+
+def load_tiktok_files(conn) -> Tuple[int, int]:
+    """Load TikTok CSV files into database.
+    Returns (rows_loaded, duplicates_skipped)
+    """
+    files = get_data_files()['tiktok']
+    if not files:
+        return 0, 0
+
+    all_dfs = _read_files(_read_tiktok_file, files)
     if not all_dfs:
         return 0, 0
 
@@ -483,50 +559,7 @@ def load_shopee_files(conn) -> Tuple[int, int]:
     if not files:
         return 0, 0
 
-    all_dfs = []
-    total_duplicates = 0
-
-    for filepath in files:
-        try:
-            df = pd.read_excel(filepath)
-
-            # Check for required columns
-            required_cols = ['หมายเลขคำสั่งซื้อ', 'ชื่อสินค้า']
-            if not all(col in df.columns for col in required_cols):
-                print(f"Skipping {filepath}: missing required columns")
-                continue
-
-            # Filter blacklisted products (only apple, iphone, ipad)
-            df = df[~df['ชื่อสินค้า'].fillna('').apply(is_blacklisted)]
-            if df.empty:
-                continue
-
-            # Rename columns according to mapping
-            df = df.rename(columns=SHOPEE_COLUMN_MAP)
-
-            # Add platform
-            df['platform'] = 'Shopee'
-
-            # Parse created_at date
-            df['created_at_dt'] = df['created_at'].apply(_parse_shopee_date)
-            df = df[df['created_at_dt'].notna()]
-            if df.empty:
-                continue
-
-            df['created_at'] = df['created_at_dt']
-            df['date'] = df['created_at_dt'].dt.date
-
-            # Remove empty order_ids
-            df['order_id'] = df['order_id'].astype(str).str.strip()
-            df = df[df['order_id'] != '']
-            if df.empty:
-                continue
-
-            all_dfs.append(df)
-
-        except Exception as e:
-            print(f"Error loading {filepath}: {e}")
-
+    all_dfs = _read_files(_read_shopee_file, files)
     if not all_dfs:
         return 0, 0
 
@@ -564,9 +597,14 @@ def load_shopee_files(conn) -> Tuple[int, int]:
     return len(final_df), total_duplicates
 
 
-@st.cache_resource
-def build_database(show_progress=True) -> bool:
-    """Build database if needed. Fast on subsequent loads."""
+@st.cache_resource(show_spinner="Loading...", max_entries=1)
+def build_database(show_progress=True, data_version: Optional[int] = None) -> bool:
+    """
+    Build database if needed. Fast on subsequent loads.
+
+    Cached per data_version (the data directory signature), so reruns skip
+    the call entirely until the data files change.
+    """
     conn = init_database()
 
     if not needs_refresh():
@@ -575,8 +613,9 @@ def build_database(show_progress=True) -> bool:
         print(f"[DuckDB] Using cached database: {count:,} records, {unique_orders:,} unique orders")
         return True
 
-    # Clear existing data
+    # Clear existing data, and any query results computed from it
     conn.execute("DELETE FROM orders")
+    st.cache_data.clear()
 
     print("[DuckDB] Loading data files...")
 
@@ -634,6 +673,7 @@ def refresh_database() -> int:
     st.cache_resource.clear()
     _conn = None
     build_database(show_progress=False)
+    clear_query_caches()
     return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
 
 
@@ -659,15 +699,43 @@ def _build_status_filter() -> str:
 # Query Functions
 # =============================================================================
 
+def _with_comparison(
+    query: str,
+    start_date: date,
+    end_date: date,
+    compare_start: date = None,
+    compare_end: date = None
+) -> Tuple[str, list]:
+    """
+    Combine a per-window query for the current and comparison windows into one statement.
+
+    The query must take (period_type, start, end) as its first three parameters.
+    Callers sort on period_type = 'previous' first to keep current rows ahead.
+    """
+    params = ['current', start_date, end_date]
+    if compare_start and compare_end:
+        query = f'({query}) UNION ALL ({query})'
+        params += ['previous', compare_start, compare_end]
+    return query, params
+
+
 def query_revenue_by_period(
     start_date: date,
     end_date: date,
     granularity: str = 'D',
     platform: str = 'All',
     compare_start: date = None,
-    compare_end: date = None
+    compare_end: date = None,
+    with_segments: bool = False
 ) -> pd.DataFrame:
-    conn = get_connection()
+    """
+    Revenue, orders and quantity per period and platform.
+
+    With with_segments, a revenue_segment column is added in SQL: per window and
+    platform, 'Max' above the 80th percentile, 'Min' below the 20th, 'Middle'
+    otherwise or with < 5 periods.
+    """
+    conn = get_cursor()
 
     if granularity == 'D':
         group_expr = 'date'
@@ -688,21 +756,29 @@ def query_revenue_by_period(
             SUM(subtotal_net) as revenue,
             COUNT(DISTINCT order_id) as orders,
             SUM(quantity) as quantity,
-            'current' as period_type
+            ? as period_type
         FROM orders
         WHERE date >= ? AND date <= ? {platform_filter} {status_filter}
         GROUP BY {group_expr}, platform
-        ORDER BY period
     '''
+    query, params = _with_comparison(query, start_date, end_date, compare_start, compare_end)
 
-    df = conn.execute(query, [start_date, end_date]).fetchdf()
-
-    if compare_start and compare_end:
-        df_compare = conn.execute(query, [compare_start, compare_end]).fetchdf()
-        df_compare['period_type'] = 'previous'
-        df = pd.concat([df, df_compare], ignore_index=True)
+    segment_expr = ""
+    if with_segments:
+        segment_expr = ''',
+            CASE
+                WHEN COUNT(*) OVER w < 5 THEN 'Middle'
+                WHEN revenue > QUANTILE_CONT(revenue, 0.80) OVER w THEN 'Max'
+                WHEN revenue < QUANTILE_CONT(revenue, 0.20) OVER w THEN 'Min'
+                ELSE 'Middle'
+            END as revenue_segment'''
 
-    return df
+    return conn.execute(f'''
+        SELECT *{segment_expr}
+        FROM ({query}) periods
+        WINDOW w AS (PARTITION BY period_type, platform)
+        ORDER BY period_type = 'previous', period, platform
+    ''', params).fetchdf()
 
 
 def query_aov_by_period(
@@ -713,7 +789,7 @@ def query_aov_by_period(
     compare_start: date = None,
     compare_end: date = None
 ) -> pd.DataFrame:
-    conn = get_connection()
+    conn = get_cursor()
 
     if granularity == 'D':
         group_expr = 'date'
@@ -734,21 +810,17 @@ def query_aov_by_period(
             SUM(subtotal_net) as revenue,
             COUNT(DISTINCT order_id) as orders,
             SUM(subtotal_net) * 1.0 / COUNT(DISTINCT order_id) as aov,
-            'current' as period_type
+            ? as period_type
         FROM orders
         WHERE date >= ? AND date <= ? {platform_filter} {status_filter}
         GROUP BY {group_expr}, platform
-        ORDER BY period
     '''
+    query, params = _with_comparison(query, start_date, end_date, compare_start, compare_end)
 
-    df = conn.execute(query, [start_date, end_date]).fetchdf()
-
-    if compare_start and compare_end:
-        df_compare = conn.execute(query, [compare_start, compare_end]).fetchdf()
-        df_compare['period_type'] = 'previous'
-        df = pd.concat([df, df_compare], ignore_index=True)
-
-    return df
+    return conn.execute(f'''
+        SELECT * FROM ({query}) periods
+        ORDER BY period_type = 'previous', period, platform
+    ''', params).fetchdf()
 
 
 def query_product_stats(
@@ -758,7 +830,7 @@ def query_product_stats(
     compare_start: date = None,
     compare_end: date = None
 ) -> pd.DataFrame:
-    conn = get_connection()
+    conn = get_cursor()
 
     platform_filter = "" if platform == 'All' else f"AND platform = '{platform}'"
     status_filter = _build_status_filter()
@@ -770,21 +842,17 @@ def query_product_stats(
             SUM(subtotal_net) as revenue,
             SUM(quantity) as quantity,
             COUNT(DISTINCT order_id) as orders,
-            'current' as period_type
+            ? as period_type
         FROM orders
         WHERE date >= ? AND date <= ? {platform_filter} {status_filter}
         GROUP BY product_name, platform
-        ORDER BY revenue DESC
     '''
+    query, params = _with_comparison(query, start_date, end_date, compare_start, compare_end)
 
-    df = conn.execute(query, [start_date, end_date]).fetchdf()
-
-    if compare_start and compare_end:
-        df_compare = conn.execute(query, [compare_start, compare_end]).fetchdf()
-        df_compare['period_type'] = 'previous'
-        df = pd.concat([df, df_compare], ignore_index=True)
-
-    return df
+    return conn.execute(f'''
+        SELECT * FROM ({query}) products
+        ORDER BY period_type = 'previous', revenue DESC, product_name
+    ''', params).fetchdf()
 
 
 def query_summary_metrics(
@@ -792,13 +860,25 @@ def query_summary_metrics(
     end_date: date,
     platform: str = 'All'
 ) -> dict:
-    conn = get_connection()
+    return query_summary_metrics_with_comparison(start_date, end_date, platform)[0]
+
+
+def query_summary_metrics_with_comparison(
+    start_date: date,
+    end_date: date,
+    platform: str = 'All',
+    compare_start: date = None,
+    compare_end: date = None
+) -> Tuple[dict, Optional[dict]]:
+    """Summary metrics for the current window and, if given, the comparison window (else None)."""
+    conn = get_cursor()
 
     platform_filter = "" if platform == 'All' else f"AND platform = '{platform}'"
     status_filter = _build_status_filter()
 
     query = f'''
         SELECT
+            ? as period_type,
             COUNT(DISTINCT order_id) as total_orders,
             COALESCE(SUM(subtotal_net), 0) as total_revenue,
             COALESCE(SUM(quantity), 0) as total_quantity,
@@ -811,17 +891,23 @@ def query_summary_metrics(
         FROM orders
         WHERE date >= ? AND date <= ? {platform_filter} {status_filter}
     '''
-
-    result = conn.execute(query, [start_date, end_date]).fetchone()
-    if result:
-        return {
-            'total_orders': result[0] or 0,
-            'total_revenue': result[1] or 0,
-            'total_quantity': result[2] or 0,
-            'aov': result[3] or 0,
-            'unique_products': result[4] or 0
+    query, params = _with_comparison(query, start_date, end_date, compare_start, compare_end)
+
+    metrics = {'current': None, 'previous': None}
+    for row in conn.execute(query, params).fetchall():
+        metrics[row[0]] = {
+            'total_orders': row[1] or 0,
+            'total_revenue': row[2] or 0,
+            'total_quantity': row[3] or 0,
+            'aov': row[4] or 0,
+            'unique_products': row[5] or 0
         }
-    return {'total_orders': 0, 'total_revenue': 0, 'total_quantity': 0, 'aov': 0, 'unique_products': 0}
+
+    empty = {'total_orders': 0, 'total_revenue': 0, 'total_quantity': 0, 'aov': 0, 'unique_products': 0}
+    current = metrics['current'] or empty
+    if compare_start and compare_end:
+        return current, metrics['previous'] or dict(empty)
+    return current, None
 
 
 def query_date_range() -> Tuple[date, date]:
@@ -868,6 +954,66 @@ def get_db_stats() -> dict:
         return {'total_rows': 0, 'unique_orders': 0, 'unique_products': 0, 'by_platform': {}, 'duplicate_count': 0}
 
 
+# =============================================================================
+# Cached Query Wrappers
+# Results only change when the orders table is rebuilt; reruns hit the cache.
+# =============================================================================
+
+@st.cache_data(ttl="5m", max_entries=4, show_spinner=False)
+def cached_date_range() -> Tuple[date, date]:
+    return query_date_range()
+
+
+@st.cache_data(ttl="5m", max_entries=4, show_spinner=False)
+def cached_db_stats() -> dict:
+    return get_db_stats()
+
+
+@st.cache_data(ttl="10m", max_entries=64, show_spinner=False)
+def cached_revenue_with_segments(
+    start_date: date, end_date: date, granularity: str, platform: str,
+    compare_start: date = None, compare_end: date = None
+) -> pd.DataFrame:
+    """Revenue by period with segments assigned, cached on the filter values."""
+    return query_revenue_by_period(
+        start_date, end_date, granularity, platform, compare_start, compare_end, with_segments=True
+    )
+
+
+@st.cache_data(ttl="10m", max_entries=64, show_spinner=False)
+def cached_aov_by_period(
+    start_date: date, end_date: date, granularity: str, platform: str,
+    compare_start: date = None, compare_end: date = None
+) -> pd.DataFrame:
+    return query_aov_by_period(start_date, end_date, granularity, platform, compare_start, compare_end)
+
+
+@st.cache_data(ttl="10m", max_entries=64, show_spinner=False)
+def cached_product_stats(
+    start_date: date, end_date: date, platform: str,
+    compare_start: date = None, compare_end: date = None
+) -> pd.DataFrame:
+    return query_product_stats(start_date, end_date, platform, compare_start, compare_end)
+
+
+@st.cache_data(ttl="10m", max_entries=64, show_spinner=False)
+def cached_summary_metrics_with_comparison(
+    start_date: date, end_date: date, platform: str,
+    compare_start: date = None, compare_end: date = None
+) -> Tuple[dict, Optional[dict]]:
+    return query_summary_metrics_with_comparison(start_date, end_date, platform, compare_start, compare_end)
+
+
+def clear_query_caches():
+    """Invalidate cached query results after the database is reloaded."""
+    cached_date_range.clear()
+    cached_db_stats.clear()
+    cached_revenue_with_segments.clear()
+    cached_aov_by_period.clear()
+    cached_product_stats.clear()
+    cached_summary_metrics_with_comparison.clear()
+
+
 def is_database_empty() -> bool:
     files = get_data_files()
     return len(files['tiktok']) == 0 and len(files['shopee']) == 0
@@ -893,6 +1039,7 @@ def load_multiple_uploaded_files(uploaded_files) -> int:
 
     # Force refresh
     st.cache_resource.clear()
+    clear_query_caches()
     global _conn
     _conn = None
 
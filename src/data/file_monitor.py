@@ -25,6 +25,37 @@ ALL_DATA_DIRS = [
     os.path.join(_PROJECT_ROOT, 'data'),
 ]
 
+# File suffixes treated as data files
+_DATA_FILE_SUFFIXES = ('.csv', '.csv.gz', '.xlsx')
+
+
+def data_directory_signature(data_dirs: Optional[List[str]] = None) -> int:
+    """
+    Cheap fingerprint of the data files: (path, mtime, size) from a
+    directory scan, XOR-folded into one int. Nothing is read from disk.
+    """
+    signature = 0
+
+    for data_dir in (ALL_DATA_DIRS if data_dirs is None else data_dirs):
+        try:
+            entries = os.scandir(data_dir)
+        except OSError:
+            continue
+
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith(_DATA_FILE_SUFFIXES):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                signature ^= hash((entry.path, stat.st_mtime_ns, stat.st_size))
+
+    return signature
+
 
 class DataFileHandler(FileSystemEventHandler):
     """Handler for file system events in the data directory."""
@@ -116,7 +147,12 @@ class DataMonitor:
         self.observer: Optional[Observer] = None
         self.handler: Optional[DataFileHandler] = None
         self._running = False
-        self._file_hashes: dict = {}
+        self._file_hashes: Optional[dict] = None  # None until the baseline is taken
+        self._dir_signature: Optional[int] = None
+
+    def directory_signature(self) -> int:
+        """Cheap fingerprint of the watched data files; see data_directory_signature."""
+        return data_directory_signature(self.data_dirs)
 
     def _calculate_file_hash(self) -> dict:
         """Calculate hashes of all data files across ALL watched directories."""
@@ -133,7 +169,7 @@ class DataMonitor:
                     continue
 
                 # Check if it's a data file
-                if filename.endswith('.csv') or filename.endswith('.csv.gz') or filename.endswith('.xlsx'):
+                if filename.endswith(_DATA_FILE_SUFFIXES):
                     try:
                         with open(filepath, 'rb') as f:
                             # Read first and last 1MB for large files
@@ -160,9 +196,15 @@ class DataMonitor:
 
     def check_for_changes(self) -> bool:
         """Check if data files have changed since last check."""
+        # Nothing was added, touched or resized: skip reading the files
+        signature = self.directory_signature()
+        if self._file_hashes is not None and signature == self._dir_signature:
+            return False
+        self._dir_signature = signature
+
         current_hashes = self._calculate_file_hash()
 
-        if not self._file_hashes:
+        if self._file_hashes is None:
             self._file_hashes = current_hashes
             return False
 
@@ -229,12 +271,29 @@ class DataMonitor:
 # Global monitor instance
 _monitor: Optional[DataMonitor] = None
 
+# Set from the observer thread once a file event has been confirmed as a real change
+_data_changed = threading.Event()
+_hash_lock = threading.Lock()
+
+
+def _on_file_event():
+    """Observer callback: hash the files off the request path and flag real changes."""
+    # The handler fires on the first event of a burst; wait out the burst so
+    # files still being written are hashed in their final state
+    time.sleep(_monitor.handler.debounce_seconds)
+    with _hash_lock:
+        if _monitor.check_for_changes():
+            _data_changed.set()
+
 
 def get_monitor() -> DataMonitor:
     """Get or create the global monitor instance watching all data directories."""
     global _monitor
     if _monitor is None:
-        _monitor = DataMonitor()
+        _monitor = DataMonitor(refresh_callback=_on_file_event)
+        # Baseline hashes, taken once per process rather than once per session
+        _monitor.check_for_changes()
+        _monitor.start_watching()
     return _monitor
 
 
@@ -256,4 +315,13 @@ def stop_monitoring():
 def check_for_new_data() -> bool:
     """Check if new data files have been added to any watched directory."""
     monitor = get_monitor()
-    return monitor.check_for_changes()
+
+    # With the observer running, hashing happens on its thread; this is just a flag check
+    if monitor.is_running():
+        if _data_changed.is_set():
+            _data_changed.clear()
+            return True
+        return False
+
+    with _hash_lock:
+        return monitor.check_for_changes()
@@ -4,6 +4,7 @@ Handles period calculations and comparisons.
 """
 
 from datetime import date, timedelta
+from functools import lru_cache
 from typing import Tuple, Optional
 import pandas as pd
 
@@ -216,6 +217,7 @@ def get_last_quarter_bounds(d: date) -> Tuple[date, date]:
     return start, end
 
 
+@lru_cache(maxsize=64)
 def format_period_label(start: date, end: date) -> str:
     """Format a date range as a readable label."""
     if start == end:
@@ -0,0 +1,94 @@
+"""
+Tests for the super query analytics.
+Top-k selection must match pandas nlargest/nsmallest(keep='first'), including ties,
+and currency values must come through run_super_query unchanged.
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from analytics.super_query import _top_k_indices, analyze_product_matrix, analyze_revenue_trend, run_super_query
+
+
+class TopKIndicesTest(unittest.TestCase):
+
+    def test_ties_at_cutoff_keep_first_rows(self):
+        values = np.array([5, 9, 7, 7, 9, 7, 1])
+        self.assertEqual(_top_k_indices(values, 3).tolist(), [1, 4, 2])
+        self.assertEqual(_top_k_indices(values, 3, largest=False).tolist(), [6, 0, 2])
+
+    def test_matches_pandas_on_random_ties(self):
+        rng = np.random.default_rng(7)
+        for _ in range(500):
+            values = rng.integers(0, 4, rng.integers(0, 20)).astype(np.float64)
+            series = pd.Series(values)
+            for k in (1, 3, 5):
+                self.assertEqual(_top_k_indices(values, k).tolist(), series.nlargest(k).index.tolist())
+                self.assertEqual(
+                    _top_k_indices(values, k, largest=False).tolist(),
+                    series.nsmallest(k).index.tolist()
+                )
+
+    def test_top_3_days_with_tied_revenue(self):
+        df = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=6),
+            'platform': 'TikTok',
+            'revenue': [100.0, 300.0, 200.0, 300.0, 200.0, 200.0],
+            'orders': [1, 3, 2, 3, 2, 2],
+        })
+        result = analyze_revenue_trend(df)
+        self.assertEqual(result['top_3_days'].index.tolist(), df['revenue'].nlargest(3).index.tolist())
+
+    def test_top_volume_products_with_tied_quantities(self):
+        # Nine low-revenue (Volume) products with tied quantities, then high-revenue ones
+        quantity = [8, 8, 12, 12, 12, 12, 12, 8, 8] + [1] * 18
+        df = pd.DataFrame({
+            'product_name': [f'P{i}' for i in range(27)],
+            'platform': 'Shopee',
+            'revenue': [10.0 + i for i in range(9)] + [500.0 + i for i in range(18)],
+            'quantity': quantity,
+            'orders': quantity,
+        })
+        result = analyze_product_matrix(df)
+
+        volume = result['segments'][result['segments']['segment'] == 'Volume']
+        expected = volume.nlargest(5, 'quantity')['product_name'].tolist()
+        self.assertEqual(result['top_volume_products']['product_name'].tolist(), expected)
+        self.assertEqual(expected, ['P2', 'P3', 'P4', 'P5', 'P6'])
+
+
+class RunSuperQueryTest(unittest.TestCase):
+
+    def test_revenue_keeps_full_precision(self):
+        revenue_df = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=6),
+            'platform': 'TikTok',
+            'revenue': [12345678.91, 12345695.91, 100.5, 200.25, 300.0, 400.75],
+            'orders': [10, 20, 3, 4, 5, 6],
+        })
+        product_df = pd.DataFrame({
+            'product_name': [f'P{i}' for i in range(6)],
+            'platform': 'Shopee',
+            'revenue': [245090.67, 1.01, 2.02, 3.03, 4.04, 5.05],
+            'quantity': [1, 2, 3, 4, 5, 6],
+            'orders': [1, 1, 1, 1, 1, 1],
+        })
+        results = run_super_query(revenue_df, product_df)
+
+        revenue = results['revenue_analysis']
+        self.assertEqual(revenue['segment_stats']['Max']['total_revenue'], 12345678.91 + 12345695.91)
+        self.assertEqual(revenue['top_3_days']['revenue'].tolist(), [12345695.91, 12345678.91, 400.75])
+        self.assertEqual(revenue['top_3_days']['revenue'].dtype, np.float64)
+
+        hero = results['product_matrix']['top_hero_products']
+        self.assertEqual(hero['revenue'].iloc[0], 245090.67)
+
+
+if __name__ == '__main__':
+    unittest.main()